@@ -3,11 +3,13 @@ import datetime
 import re
 import logging
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, InitVar
 
 from .exceptions import AdviserPredictionOrderSideParseError, \
     AdviserPredictionOpenPriceParseError, AdviserPredictionStopLossParseError,\
     AdviserPredictionTakeProfitParseError
+from .templates import PredictionTemplate, TemplateRegistry, \
+    default_registry
 from crypto_math import ED
 from market_utils import OrderSide
 
@@ -23,6 +25,23 @@ prediction_properties_patterns = {
 }
 
 
+def parse_generic(text: str) -> dict:
+    '''Scans every line of upper cased message for all keywords'''
+    def get_numbers(s: str) -> list:
+        pattens_to_clear = [' 1-', ' 2-', ' 3-', ' 4-']
+        for pattern in pattens_to_clear:
+            s = s.replace(pattern, ' ')
+
+        return list(map(ED, re.findall(r"[-+]?\d*\.?\d+|\d+", s)))
+
+    prediction = {}
+    for s in text.split('\n'):
+        for k, patterns_list in prediction_properties_patterns.items():
+            if any([s.find(pattern) >= 0 for pattern in patterns_list]):
+                prediction[k] = sorted(list(map(abs, get_numbers(s))))
+    return prediction
+
+
 @dataclass
 class AdviserPrediction():
     id: str = field(init=False)
@@ -36,31 +55,35 @@ class AdviserPrediction():
     stop_losses: list[ED] = field(init=False, default_factory=list)
     take_profits: list[ED] = field(init=False, default_factory=list)
 
+    # Known only if message fits one of adviser templates
+    symbol: str = field(init=False, default='')
+    leverage: ED = field(init=False, default=ED(0))
+
+    # Registry of adviser templates to try before generic parsing,
+    # used only while parsing and not kept in the prediction
+    registry: InitVar[TemplateRegistry] = default_registry
+
     def generate_id(self) -> str:
         '''Generated ID as uuid64'''
         return str(uuid.uuid4())
 
-    def __post_init__(self) -> None:
-        def get_numbers(s: str) -> list:
-            pattens_to_clear = [' 1-', ' 2-', ' 3-', ' 4-']
-            for pattern in pattens_to_clear:
-                s = s.replace(pattern, ' ')
-
-            return list(map(ED, re.findall(r"[-+]?\d*\.?\d+|\d+", s)))
-
+    def __post_init__(self, registry: TemplateRegistry) -> None:
         self.id = self.generate_id()
         self.dt = datetime.datetime
 
-        prediction = {}
-        for s in self.prediction_text.upper().split('\n'):
-            for k, patterns_list in prediction_properties_patterns.items():
-                if any([s.find(pattern) >= 0 for pattern in patterns_list]):
-                    prediction[k] = sorted(list(map(abs, get_numbers(s))))
+        text = self.prediction_text.upper()
+        prediction = registry.parse(self.adviser, text) \
+            if registry is not None else {}
+        if not prediction:
+            prediction = parse_generic(text)
+
+        self.symbol = prediction.get('symbol', self.symbol)
+        self.leverage = prediction.get('leverage', self.leverage)
 
         if 'buy_side' in prediction:
             self.side = OrderSide.BUY
         elif 'sell_side' in prediction:
-            self.side = OrderSide.BUY
+            self.side = OrderSide.SELL
         else:
             raise AdviserPredictionOrderSideParseError(
                 f'No side pattern found in {self.prediction_text=}')
@@ -0,0 +1,147 @@
+import re
+import logging
+
+from dataclasses import dataclass, field
+
+from crypto_math import ED
+
+logger = logging.getLogger(__name__)
+
+NUMBER_PATTERN = re.compile(r'\d*\.?\d+')
+SYMBOL_SEPARATORS = re.compile(r'[^A-Z0-9]')
+
+
+@dataclass
+class PredictionTemplate():
+    '''
+    Fixed layout of one adviser's messages.
+    1. markers are cheap substrings which all must be present in upper
+       cased message to select the template (message fingerprint).
+    2. Every field pattern is precompiled once and has to contain one
+       group with the text of the field.
+    '''
+    name: str
+    markers: tuple[str, ...]
+
+    symbol: str
+    side: str
+    open: str
+    tp: str
+    sl: str
+    leverage: str = field(default='')
+    # Pattern to skip enumeration like "1-6.411 2-6.475" in tp values
+    enumeration: str = field(default=r'(?:^|\s)\d-')
+
+    def __post_init__(self) -> None:
+        self._patterns = {
+            name: re.compile(getattr(self, name))
+            for name in ('symbol', 'side', 'open', 'tp', 'sl', 'leverage')
+            if getattr(self, name)}
+        self._enumeration = re.compile(self.enumeration)
+
+    def fits(self, text: str) -> bool:
+        '''Checks fingerprint of upper cased message'''
+        for marker in self.markers:
+            if marker not in text:
+                return False
+        return True
+
+    def get_numbers(self, s: str, enumerated: bool = False) -> list[ED]:
+        '''enumerated: s may be a numbered list of values'''
+        if enumerated:
+            s = self._enumeration.sub(' ', s)
+        return sorted(map(ED, NUMBER_PATTERN.findall(s)))
+
+    def extract(self, text: str) -> dict:
+        '''
+        Extracts fields from upper cased message.
+        Returns empty dict if any required field is not found.
+        '''
+        found = {}
+        for name, pattern in self._patterns.items():
+            match = pattern.search(text)
+            if match is None:
+                if name == 'leverage':
+                    continue
+                logger.debug(f'Template {self.name} has no {name} in {text=}')
+                return {}
+            found[name] = match.group(1)
+
+        prediction = {
+            'symbol': SYMBOL_SEPARATORS.sub('', found['symbol']),
+            'buy_side' if found['side'] in ('LONG', 'BUY')
+            else 'sell_side': [],
+            'open': self.get_numbers(found['open']),
+            'tp': self.get_numbers(found['tp'], enumerated=True),
+            'sl': self.get_numbers(found['sl']),
+        }
+        if 'leverage' in found:
+            prediction['leverage'] = ED(found['leverage'])
+        return prediction
+
+
+class TemplateRegistry():
+    '''
+    Keeps adviser templates and selects one by message fingerprint.
+    Template which matched adviser's message last time is checked first.
+    '''
+
+    def __init__(self, templates: list[PredictionTemplate] = None) -> None:
+        self.templates: list[PredictionTemplate] = list(templates or [])
+        self.adviser_templates: dict[str, PredictionTemplate] = {}
+
+    def register(self, template: PredictionTemplate) -> None:
+        self.templates.append(template)
+
+    def match(self, adviser: str, text: str) -> PredictionTemplate:
+        '''Returns template fitting upper cased message or None'''
+        template = self.adviser_templates.get(adviser)
+        if template is not None and template.fits(text):
+            return template
+
+        for template in self.templates:
+            if template.fits(text):
+                self.adviser_templates[adviser] = template
+                return template
+        return None
+
+    def parse(self, adviser: str, text: str) -> dict:
+        '''
+        Parses upper cased message by fitting template.
+        Returns empty dict if no template fits or extraction fails.
+        '''
+        template = self.match(adviser, text)
+        if template is None:
+            return {}
+        prediction = template.extract(text)
+        if not prediction:
+            self.adviser_templates.pop(adviser, None)
+        return prediction
+
+
+# 🎈 #LINK/USDT - LONG📈 / Открытие - ... / Цели - 1-... / Плечо - х20 / Стоп
+HASHTAG_TEMPLATE = PredictionTemplate(
+    name='hashtag',
+    markers=('#', 'ОТКРЫТИЕ', 'ЦЕЛИ', 'СТОП'),
+    symbol=r'#([A-Z0-9]+/[A-Z0-9]+)',
+    side=r'#[A-Z0-9]+/[A-Z0-9]+\s*-\s*(LONG|SHORT|BUY|SELL)',
+    open=r'ОТКРЫТИЕ\s*-\s*([^\n]*)',
+    tp=r'ЦЕЛИ\s*-\s*([^\n]*)',
+    sl=r'СТОП\s*-\s*([^\n]*)',
+    leverage=r'ПЛЕЧО\s*-\s*[XХ]\s*(\d+)',
+)
+
+# SOL | USDT = LONG / Точка входа: ... / Тейк-профит: ... | ... /
+# Кредитное плечо: 50x / Стоп-лосс: ...
+POINT_TEMPLATE = PredictionTemplate(
+    name='point',
+    markers=('ТОЧКА ВХОДА', 'ТЕЙК-ПРОФИТ', 'СТОП-ЛОСС'),
+    symbol=r'([A-Z0-9]+\s*\|\s*[A-Z0-9]+)\s*=',
+    side=r'[A-Z0-9]+\s*\|\s*[A-Z0-9]+\s*=\s*(LONG|SHORT|BUY|SELL)',
+    open=r'ТОЧКА ВХОДА\s*:\s*([^\n]*)',
+    tp=r'ТЕЙК-ПРОФИТ\s*:\s*([^\n]*)',
+    sl=r'СТОП-ЛОСС\s*:\s*([^\n]*)',
+    leverage=r'ПЛЕЧО\s*:\s*(\d+)\s*[XХ]',
+)
+
+default_registry = TemplateRegistry([HASHTAG_TEMPLATE, POINT_TEMPLATE])
@@ -0,0 +1,51 @@
+'''
+Throughput of adviser template fast paths against generic parsing.
+
+Run from order_parser directory:
+    python -m benchmarks.bench_advparser [rounds]
+'''
+import sys
+import timeit
+
+from advparser import AdviserPrediction
+from advparser.templates import default_registry
+
+HASHTAG_ADVISE = """
+    🎈 #LINK/USDT - LONG📈
+
+    🟢 Открытие - 6.342-6.153
+
+    ✅ Цели - 1-6.411 2-6.475  3-6.529 4-6.611
+
+    ♾ - Плечо - х20 (Cross)
+
+    🔴 Стоп - 5.965
+    """
+
+POINT_ADVISE = """
+    SOL | USDT = SHORT
+
+    Точка входа: 19.180
+    Тейк-профит: 18.422 | 17.854
+    Кредитное плечо: 50x
+    Стоп-лосс: 19.609
+    """
+
+
+def main(rounds: int = 5000) -> None:
+    for advise_name, advise in (('hashtag', HASHTAG_ADVISE),
+                                ('point', POINT_ADVISE)):
+        for name, registry in (('generic', None),
+                               ('template', default_registry)):
+            elapsed = timeit.timeit(
+                lambda: AdviserPrediction(adviser=advise_name,
+                                          prediction_text=advise,
+                                          registry=registry),
+                number=rounds)
+            print(f'{advise_name:>8} {name:>8}: '
+                  f'{rounds / elapsed:.0f} msg/s '
+                  f'{elapsed / rounds * 1e6:.1f} us/msg')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,68 @@
+'''
+Memory comparison of TP/SL ladders: four MarketPosition-keyed dicts
+per order (legacy SimpleOrder.update) against one PositionLadder array
+per side.
+
+Run from order_parser directory:
+    python -m benchmarks.bench_ladder_memory [orders] [levels]
+'''
+import sys
+import time
+import tracemalloc
+
+from market_utils import MarketPosition, PositionLadder
+
+
+def make_levels(levels: int, base_price: float) -> list[MarketPosition]:
+    return [MarketPosition(1, base_price * (1 + 0.01 * (num + 1)))
+            for num in range(levels)]
+
+
+def legacy_ladder(open: MarketPosition, current: MarketPosition,
+                  levels: list[MarketPosition]) -> tuple[dict, dict]:
+    open_deltas, current_deltas = {}, {}
+    for level in levels:
+        open_deltas[level] = level - open
+        open_deltas[level].roi = open_deltas[level].value / open.value
+        current_deltas[level] = level - current
+        current_deltas[level].roi = current_deltas[level].value / open.value
+    return open_deltas, current_deltas
+
+
+def array_ladder(open: MarketPosition, current: MarketPosition,
+                 levels: list[MarketPosition]) -> PositionLadder:
+    ladder = PositionLadder(direction=-1)
+    ladder.update(levels=levels, open=open, current=current)
+    return ladder
+
+
+def measure(builder, orders: int, levels: int) -> tuple[int, float]:
+    inputs = []
+    for num in range(orders):
+        open = MarketPosition(levels, 100 + num)
+        current = MarketPosition(levels, 101 + num)
+        inputs.append((open, current, make_levels(levels, 100 + num)))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Two ladders (losses and profits) per order
+    keep = [(builder(*args), builder(*args)) for args in inputs]
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del keep
+    return size, elapsed
+
+
+def main(orders: int = 5000, levels: int = 4) -> None:
+    for name, builder in (('dicts', legacy_ladder),
+                          ('ladder', array_ladder)):
+        size, elapsed = measure(builder, orders, levels)
+        print(f'{name:>8}: {orders=} {levels=} '
+              f'memory={size / 1024:.1f} KiB '
+              f'per_order={size / orders:.0f} B '
+              f'time={elapsed * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
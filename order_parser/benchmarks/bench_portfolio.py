@@ -0,0 +1,65 @@
+'''
+Per tick cost of Portfolio risk aggregation against per order
+SimpleOrder.update().
+
+Run from order_parser directory:
+    python -m benchmarks.bench_portfolio [orders] [rounds]
+'''
+import random
+import sys
+import timeit
+
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder
+from portfolio import Portfolio
+
+SYMBOLS = [f'COIN{num}USDT' for num in range(50)]
+
+
+def make_orders(orders: int) -> list[SimpleOrder]:
+    rnd = random.Random(1)
+    res = []
+    for num in range(orders):
+        price = rnd.uniform(1, 100)
+        side = rnd.choice(list(OrderSide))
+        sign = 1 if side == OrderSide.BUY else -1
+        res.append(SimpleOrder(
+            category=OrderCategory.LINEAR,
+            type=OrderType.MARKET,
+            symbol=rnd.choice(SYMBOLS),
+            side=side,
+            open=MarketPosition(4, price),
+            stop_losses=[MarketPosition(2, price * (1 - sign * 0.05)),
+                         MarketPosition(2, price * (1 - sign * 0.1))],
+            take_profits=[MarketPosition(1, price * (1 + sign * k / 100))
+                          for k in range(1, 5)],
+            adviser=f'adviser{num % 7}'))
+    return res
+
+
+def main(orders: int = 500, rounds: int = 100) -> None:
+    so_list = make_orders(orders)
+    portfolio = Portfolio(so_list)
+    prices = {symbol: random.uniform(1, 100) for symbol in SYMBOLS}
+
+    def tick_portfolio():
+        portfolio.update_prices(prices)
+        portfolio.calculate()
+        portfolio.totals()
+        portfolio.by_symbol()
+        portfolio.by_side()
+        portfolio.by_adviser()
+
+    def tick_orders():
+        for so in so_list:
+            so.current.price = prices[so.symbol]
+            so.update()
+
+    for name, tick in (('orders', tick_orders),
+                       ('portfolio', tick_portfolio)):
+        elapsed = timeit.timeit(tick, number=rounds) / rounds
+        print(f'{name:>10}: {orders=} {elapsed * 1e3:.2f} ms/tick')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,96 @@
+'''
+Signal-to-placement latency of the regular SimpleOrder flow against
+pre-armed order templates, with simulated exchange round trip.
+Total is the time until the flow returns: the regular flow follows
+placement with get_tickers, the armed one reads its TickerSnapshot,
+which is refreshed in advance.
+
+Run from order_parser directory:
+    python -m benchmarks.bench_prearm [rounds] [round_trip_ms]
+'''
+import sys
+import time
+
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from prearm import OrderArmory
+from tickers import TickerSnapshot
+from simpleorder import SimpleOrder
+from loadgen import FakeExchange
+
+
+class DelayedSession(FakeExchange):
+    '''Adds fixed round trip to every request'''
+
+    def __init__(self, round_trip: float, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.round_trip = round_trip
+        self.placed_at = None
+
+    def get_instruments_info(self, **kwargs) -> dict:
+        time.sleep(self.round_trip)
+        return super().get_instruments_info(**kwargs)
+
+    def get_tickers(self, **kwargs) -> dict:
+        time.sleep(self.round_trip)
+        return super().get_tickers(**kwargs)
+
+    def place_order(self, **kwargs) -> dict:
+        # Order reaches exchange after half of round trip
+        time.sleep(self.round_trip / 2)
+        self.placed_at = time.perf_counter()
+        time.sleep(self.round_trip / 2)
+        return super().place_order(**kwargs)
+
+
+def signal_positions() -> dict:
+    return dict(side=OrderSide.BUY,
+                open=MarketPosition('3.4', '0.020012'),
+                stop_losses=[MarketPosition(1, '0.0150001')],
+                take_profits=[MarketPosition(1, '0.03'),
+                              MarketPosition(2, '0.040003')])
+
+
+def regular_flow(session: DelayedSession) -> None:
+    so = SimpleOrder(category=OrderCategory.LINEAR,
+                     type=OrderType.MARKET,
+                     symbol='PEOPLEUSDT',
+                     **signal_positions())
+    so.api_update_current_price(session)
+    so.api_update_instrument_info(session)
+    so.fit_market_positions()
+    so.api_place_order(session)
+
+
+def armed_flow(session: DelayedSession, armory: OrderArmory) -> None:
+    so = armory.build_order(symbol='PEOPLEUSDT', **signal_positions())
+    armory.place(session, so)
+
+
+def main(rounds: int = 20, round_trip_ms: float = 20) -> None:
+    session = DelayedSession(round_trip=round_trip_ms / 1000,
+                             symbols={'PEOPLEUSDT': (0.02001, 5)}, seed=1)
+    snapshot = TickerSnapshot(session, OrderCategory.LINEAR, max_age=60)
+    snapshot.refresh()
+    armory = OrderArmory(category=OrderCategory.LINEAR,
+                         watchlist=['PEOPLEUSDT'],
+                         snapshot=snapshot)
+    armory.api_arm(session)
+
+    for name, flow in (('regular', lambda: regular_flow(session)),
+                       ('armed', lambda: armed_flow(session, armory))):
+        latencies, totals = [], []
+        for _ in range(int(rounds)):
+            start = time.perf_counter()
+            flow()
+            totals.append(time.perf_counter() - start)
+            latencies.append(session.placed_at - start)
+        latencies.sort()
+        totals.sort()
+        print(f'{name:>8}: {round_trip_ms=} signal-to-placement '
+              f'median={latencies[len(latencies) // 2] * 1e3:.2f} ms '
+              f'max={latencies[-1] * 1e3:.2f} ms, total '
+              f'median={totals[len(totals) // 2] * 1e3:.2f} ms')
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:3]))
@@ -0,0 +1,44 @@
+'''
+Size and speed of wire format against pickle for SimpleOrder.
+
+Run from order_parser directory:
+    python -m benchmarks.bench_wire [rounds]
+'''
+import pickle
+import sys
+import timeit
+
+import wire
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder
+
+
+def make_order() -> SimpleOrder:
+    so = SimpleOrder(category=OrderCategory.LINEAR,
+                     type=OrderType.MARKET,
+                     symbol='PEOPLEUSDT',
+                     side=OrderSide.BUY,
+                     open=MarketPosition(3, '0.02'),
+                     stop_losses=[MarketPosition(1, '0.005'),
+                                  MarketPosition(2, '0.002')],
+                     take_profits=[MarketPosition(1, '0.0555'),
+                                   MarketPosition(1, '0.03'),
+                                   MarketPosition(1, '0.04')])
+    so.update()
+    return so
+
+
+def main(rounds: int = 2000) -> None:
+    so = make_order()
+    for name, dumps, loads in (
+            ('pickle', pickle.dumps, pickle.loads),
+            ('wire', wire.encode, wire.decode)):
+        data = dumps(so)
+        encode = timeit.timeit(lambda: dumps(so), number=rounds) / rounds
+        decode = timeit.timeit(lambda: loads(data), number=rounds) / rounds
+        print(f'{name:>8}: size={len(data)} B '
+              f'encode={encode * 1e6:.1f} us decode={decode * 1e6:.1f} us')
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
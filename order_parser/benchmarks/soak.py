@@ -0,0 +1,32 @@
+'''
+Soak test of the signal pipeline under sustained synthetic load.
+Prints throughput, latency percentiles, RSS and gc tracked objects
+every report interval. Steady growth of RSS or objects after live
+orders are filled up points to a leak, growth of p99 to a slowdown.
+
+Run from order_parser directory:
+    python -m benchmarks.soak [duration_s] [rate] [report_interval_s] \
+        [latency_ms]
+rate=0 sends signals as fast as possible.
+'''
+import sys
+
+from loadgen import SignalGenerator, SignalPipeline, SoakTest, \
+    FakeExchange, DEFAULT_SYMBOLS
+
+
+def main(duration: float = 60, rate: float = 200,
+         report_interval: float = 5, latency_ms: float = 0) -> None:
+    generator = SignalGenerator(seed=1)
+    exchange = FakeExchange(latency=latency_ms / 1000, seed=1)
+    pipeline = SignalPipeline(exchange, watchlist=list(DEFAULT_SYMBOLS))
+    soak = SoakTest(generator, pipeline, rate=rate,
+                    report_interval=report_interval)
+    print(f'{soak} for {duration=}s with {exchange}')
+    report = soak.run(duration=duration, on_sample=print)
+    print(report)
+    print(f'exchange calls {dict(exchange.calls)}')
+
+
+if __name__ == '__main__':
+    main(*map(float, sys.argv[1:5]))
@@ -0,0 +1,297 @@
+'''
+Latency-budgeted wrapper around one or more pybit HTTP sessions.
+
+GuardedSession exposes the same methods as HTTP, so it is passed to
+SimpleOrder.api_* instead of a plain session:
+1. Every call waits at most its latency budget.
+2. Idempotent reads (tickers, instruments info, ...) are hedged: if the
+   first session is slow, a duplicate request goes to the next session
+   and the first response wins. Failed reads fail over at once.
+3. place_order is retried within its budget keyed on orderLinkId:
+   every attempt waits only its own share of the budget, and before
+   resending, the exchange is asked whether the order already exists.
+   Duplicate orderLinkId rejections are resolved the same way.
+4. RequestMetrics counts how often budgets, hedges and retries fired.
+'''
+import time
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, Future, wait, \
+    FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable
+from pybit.unified_trading import HTTP
+from pybit.exceptions import InvalidRequestError
+
+from guardedsession.exceptions import ErrorRequestTimeout, \
+    ErrorRequestFailed
+
+logger = logging.getLogger(__name__)
+
+# Reads which are safe to send twice
+HEDGED_METHODS = frozenset({
+    'get_tickers', 'get_instruments_info', 'get_orderbook', 'get_kline',
+    'get_positions', 'get_open_orders', 'get_order_history',
+    'get_server_time',
+})
+
+# Bybit retCode of place_order with already used orderLinkId
+DUPLICATE_ORDER_LINK_ID = 110072
+
+
+@dataclass
+class RequestMetrics():
+    calls: int = field(default=0)
+    timeouts: int = field(default=0)
+    errors: int = field(default=0)
+    hedges: int = field(default=0)        # Duplicate requests sent
+    hedges_won: int = field(default=0)    # Duplicate answered first
+    failovers: int = field(default=0)     # Next session after error
+    retries: int = field(default=0)       # place_order resent
+    recovered: int = field(default=0)     # place_order found on exchange
+    latency_total: float = field(default=0.)
+    _lock: threading.Lock = field(default_factory=threading.Lock,
+                                  repr=False, compare=False)
+
+    def add(self, **counters) -> None:
+        with self._lock:
+            for name, val in counters.items():
+                setattr(self, name, getattr(self, name) + val)
+
+    @property
+    def latency_avg(self) -> float:
+        return self.latency_total / self.calls if self.calls else 0.
+
+
+class GuardedSession():
+
+    def __init__(self,
+                 sessions: list[HTTP],
+                 budgets: dict[str, float] = None,
+                 default_budget: float = 5.0,
+                 hedge_after: float = 0.3,
+                 hedged_methods: frozenset = HEDGED_METHODS,
+                 place_retries: int = 2,
+                 place_attempt_timeout: float = None,
+                 max_workers: int = 16,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        '''
+        sessions: primary session first, then failover sessions
+            (e.g. other API domains or accounts proxies)
+        budgets: latency budget in seconds by method name
+        hedge_after: seconds to wait before hedging a read
+        place_attempt_timeout: seconds one place_order attempt with
+            orderLinkId waits, by default budget / (place_retries + 2),
+            so time is left for lookup of the order after the last
+            attempt. Orders without orderLinkId wait the whole budget.
+        '''
+        if not sessions:
+            raise ValueError('At least one session is required')
+        self.sessions = list(sessions)
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.hedge_after = hedge_after
+        self.hedged_methods = hedged_methods
+        self.place_retries = place_retries
+        self.place_attempt_timeout = place_attempt_timeout
+        self.clock = clock
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='guardedsession')
+        self.metrics: dict[str, RequestMetrics] = {}
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self.sessions)=}, '\
+            f'{self.default_budget=}, {self.hedge_after=})'
+
+    def __getattr__(self, name: str):
+        method = getattr(self.sessions[0], name)
+        if not callable(method):
+            return method
+
+        def call(**kwargs) -> dict:
+            if name == 'place_order':
+                return self._place_order(kwargs)
+            if name in self.hedged_methods:
+                return self._hedged(name, kwargs)
+            return self._single(name, kwargs)
+        return call
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def budget(self, name: str) -> float:
+        return self.budgets.get(name, self.default_budget)
+
+    def method_metrics(self, name: str) -> RequestMetrics:
+        return self.metrics.setdefault(name, RequestMetrics())
+
+    def _submit(self, session: HTTP, name: str, kwargs: dict) -> Future:
+        return self.executor.submit(getattr(session, name), **kwargs)
+
+    def _single(self, name: str, kwargs: dict,
+                deadline: float = None) -> dict:
+        '''Calls primary session within budget'''
+        metrics = self.method_metrics(name)
+        start = self.clock()
+        deadline = deadline or start + self.budget(name)
+        future = self._submit(self.sessions[0], name, kwargs)
+        try:
+            res = future.result(timeout=max(deadline - self.clock(), 0))
+        except TimeoutError:
+            metrics.add(calls=1, timeouts=1)
+            logger.error(f'{name} exceeded latency budget in {self}')
+            raise ErrorRequestTimeout(name)
+        except Exception:
+            metrics.add(calls=1, errors=1)
+            raise
+        metrics.add(calls=1, latency_total=self.clock() - start)
+        return res
+
+    def _hedged(self, name: str, kwargs: dict) -> dict:
+        '''
+        Calls sessions one after another: next one is started when
+        previous fails or does not answer in hedge_after seconds.
+        First answer wins.
+        '''
+        metrics = self.method_metrics(name)
+        start = self.clock()
+        deadline = start + self.budget(name)
+        sessions = iter(self.sessions)
+        first = self._submit(next(sessions), name, kwargs)
+        pending = {first}
+        next_hedge = start + self.hedge_after
+        error = None
+
+        while True:
+            now = self.clock()
+            timeout = min(deadline, next_hedge) - now
+            done, pending = wait(pending, timeout=max(timeout, 0),
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    res = future.result()
+                except Exception as e:
+                    error = e
+                    metrics.add(errors=1)
+                    logger.warning(f'{name} failed in {self}: {e}')
+                    continue
+                metrics.add(calls=1, latency_total=self.clock() - start,
+                            hedges_won=int(future is not first))
+                return res
+
+            now = self.clock()
+            if now >= deadline:
+                break
+            if not pending or now >= next_hedge:
+                session = next(sessions, None)
+                if session is None:
+                    if not pending:
+                        break
+                    next_hedge = deadline
+                    continue
+                metrics.add(**{'hedges' if pending else 'failovers': 1})
+                pending.add(self._submit(session, name, kwargs))
+                next_hedge = now + self.hedge_after
+
+        metrics.add(calls=1)
+        if pending:
+            metrics.add(timeouts=1)
+            logger.error(f'{name} exceeded latency budget in {self}')
+            raise ErrorRequestTimeout(name)
+        logger.error(f'{name} failed on all sessions of {self}: {error}')
+        raise ErrorRequestFailed(name) from error
+
+    @staticmethod
+    def _is_duplicate(res_or_error) -> bool:
+        if isinstance(res_or_error, dict):
+            return res_or_error.get('retCode') == DUPLICATE_ORDER_LINK_ID
+        return getattr(res_or_error, 'status_code', None) == \
+            DUPLICATE_ORDER_LINK_ID
+
+    def _find_order(self, kwargs: dict, deadline: float) -> dict:
+        '''
+        Looks for order by orderLinkId among open and recent orders.
+        Returns place_order-like response or None.
+        '''
+        query = {'category': kwargs['category'],
+                 'symbol': kwargs['symbol'],
+                 'orderLinkId': kwargs['orderLinkId']}
+        for name in ('get_open_orders', 'get_order_history'):
+            try:
+                res = self._single(name, query, deadline=deadline)
+            except Exception as e:
+                logger.warning(f'Lookup of {query} by {name} failed: {e}')
+                continue
+            if res.get('retCode') == 0 and res['result']['list']:
+                order = res['result']['list'][0]
+                return {'retCode': 0, 'retMsg': 'OK',
+                        'result': {'orderId': order['orderId'],
+                                   'orderLinkId': order['orderLinkId']}}
+        return None
+
+    def _place_order(self, kwargs: dict) -> dict:
+        '''
+        Places order within budget. With orderLinkId every attempt waits
+        at most place_attempt_timeout, and lost or timed out requests are
+        resolved by orderLinkId lookup and resent only if the order does
+        not exist on exchange.
+        '''
+        name = 'place_order'
+        metrics = self.method_metrics(name)
+        budget = self.budget(name)
+        deadline = self.clock() + budget
+        can_retry = bool(kwargs.get('orderLinkId'))
+        # Without orderLinkId there is only one attempt and no lookup,
+        # so it may use the whole budget
+        attempt_timeout = budget if not can_retry else \
+            self.place_attempt_timeout or budget / (self.place_retries + 2)
+        error = None
+
+        for attempt in range(self.place_retries + 1):
+            if attempt:
+                if not can_retry or self.clock() >= deadline:
+                    break
+                found = self._find_order(kwargs, deadline)
+                if found is not None:
+                    metrics.add(recovered=1)
+                    logger.info(f'Order {kwargs["orderLinkId"]} '
+                                'found on exchange after failed placement')
+                    return found
+                if self.clock() >= deadline:
+                    break
+                metrics.add(retries=1)
+                logger.warning(f'Resending order {kwargs["orderLinkId"]}')
+
+            try:
+                res = self._single(
+                    name, kwargs,
+                    deadline=min(deadline, self.clock() + attempt_timeout))
+            except InvalidRequestError as e:
+                # Exchange answered, only duplicate is worth resolving
+                if can_retry and self._is_duplicate(e):
+                    res = {'retCode': DUPLICATE_ORDER_LINK_ID}
+                else:
+                    raise
+            except Exception as e:
+                # Request may be lost before or after reaching exchange
+                error = e
+                logger.warning(f'{name} {kwargs.get("orderLinkId")} '
+                               f'attempt {attempt} failed: {e}')
+                continue
+            if can_retry and self._is_duplicate(res):
+                found = self._find_order(kwargs, deadline)
+                if found is not None:
+                    metrics.add(recovered=1)
+                    return found
+            return res
+
+        # Last attempt may have reached exchange too
+        if can_retry and error is not None and self.clock() < deadline:
+            found = self._find_order(kwargs, deadline)
+            if found is not None:
+                metrics.add(recovered=1)
+                logger.info(f'Order {kwargs["orderLinkId"]} '
+                            'found on exchange after failed placement')
+                return found
+        raise error or ErrorRequestTimeout(name)
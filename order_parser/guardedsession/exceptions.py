@@ -0,0 +1,10 @@
+class ErrorRequestBudget(Exception):
+    pass
+
+
+class ErrorRequestTimeout(ErrorRequestBudget):
+    pass
+
+
+class ErrorRequestFailed(ErrorRequestBudget):
+    pass
@@ -0,0 +1,300 @@
+'''
+Streaming candle indicators.
+
+Every indicator keeps rolling state, so update() with a new closed candle
+costs O(1). backfill() computes the whole series over historical arrays
+in a vectorized way and leaves the indicator ready for update().
+'''
+import math
+import logging
+
+from collections import deque
+from dataclasses import dataclass
+from typing import NamedTuple
+
+import numpy as np
+
+from crypto_math import ED
+from market_utils import MarketPosition
+from simpleorder import TrailingStop
+
+logger = logging.getLogger(__name__)
+
+
+class Candle(NamedTuple):
+    start: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    turnover: float = 0.
+
+
+@dataclass
+class Candles():
+    '''Candle columns as arrays from oldest to newest'''
+    start: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    turnover: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __iter__(self):
+        for row in zip(self.start, self.open, self.high, self.low,
+                       self.close, self.volume, self.turnover):
+            yield Candle(int(row[0]), *map(float, row[1:]))
+
+    @classmethod
+    def from_kline(cls, res: dict):
+        '''
+        Builds candles from session.get_kline() response,
+        whose list is sorted from newest to oldest
+        '''
+        rows = np.array(res['result']['list'], dtype=np.float64)[::-1]
+        if not len(rows):
+            rows = np.empty((0, 7))
+        return cls(start=rows[:, 0].astype(np.int64),
+                   **{name: np.ascontiguousarray(rows[:, num])
+                      for num, name in enumerate(
+                          ('open', 'high', 'low', 'close',
+                           'volume', 'turnover'), start=1)})
+
+
+def _ema_series(x: np.ndarray, alpha: float, seed: float) -> np.ndarray:
+    '''
+    y[t] = alpha * x[t] + (1 - alpha) * y[t - 1], y[-1] = seed.
+    Calculated by blocks where powers of (1 - alpha) stay in float range.
+    '''
+    res = np.empty(len(x))
+    decay = 1 - alpha
+    if decay <= 0:
+        res[:] = x
+        return res
+    block = max(1, min(len(x), int(250 / -math.log10(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    prev = seed
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        k = len(chunk)
+        p = powers[:k]
+        # sum_j alpha * decay^(i-j) * x_j = decay^i * cumsum(x_j / decay^j)
+        res[start:start + k] = p * prev + alpha * p * np.cumsum(chunk / p)
+        prev = res[start + k - 1]
+    return res
+
+
+class SMA():
+    '''Simple moving average of close'''
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.window: deque = deque(maxlen=period)
+        self.total = 0.
+        self.value = math.nan
+
+    def _push(self, x: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        self.value = self.total / self.period \
+            if len(self.window) == self.period else math.nan
+        return self.value
+
+    def update(self, candle: Candle) -> float:
+        return self._push(candle.close)
+
+    def backfill(self, candles: Candles) -> np.ndarray:
+        x = candles.close
+        res = np.full(len(x), np.nan)
+        if len(x) >= self.period:
+            cum = np.concatenate(([0.], np.cumsum(x)))
+            res[self.period - 1:] = \
+                (cum[self.period:] - cum[:-self.period]) / self.period
+        self.window = deque(x[-self.period:].tolist(), maxlen=self.period)
+        self.total = float(sum(self.window))
+        self.value = float(res[-1]) if len(res) else math.nan
+        return res
+
+
+class EMA():
+    '''Exponential moving average of close seeded by first close'''
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = math.nan
+
+    def update(self, candle: Candle) -> float:
+        if math.isnan(self.value):
+            self.value = candle.close
+        else:
+            self.value += self.alpha * (candle.close - self.value)
+        return self.value
+
+    def backfill(self, candles: Candles) -> np.ndarray:
+        x = candles.close
+        if not len(x):
+            return np.empty(0)
+        res = _ema_series(x, self.alpha, seed=float(x[0]))
+        self.value = float(res[-1])
+        return res
+
+
+class ATR():
+    '''
+    Average true range with Wilder smoothing,
+    seeded by simple average of first period true ranges
+    '''
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self.prev_close = math.nan
+        self.seed: list[float] = []
+        self.value = math.nan
+
+    def _true_range(self, candle: Candle) -> float:
+        if math.isnan(self.prev_close):
+            return candle.high - candle.low
+        return max(candle.high, self.prev_close) - \
+            min(candle.low, self.prev_close)
+
+    def update(self, candle: Candle) -> float:
+        tr = self._true_range(candle)
+        self.prev_close = candle.close
+        if len(self.seed) < self.period:
+            self.seed.append(tr)
+            if len(self.seed) == self.period:
+                self.value = sum(self.seed) / self.period
+            return self.value
+        self.value += (tr - self.value) / self.period
+        return self.value
+
+    def backfill(self, candles: Candles) -> np.ndarray:
+        high, low, close = candles.high, candles.low, candles.close
+        n = len(close)
+        res = np.full(n, np.nan)
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        tr = np.where(np.isnan(prev_close), high - low,
+                      np.fmax(high, prev_close) - np.fmin(low, prev_close))
+        self.prev_close = float(close[-1]) if n else math.nan
+        self.seed = tr[:self.period].tolist()
+        if n >= self.period:
+            seed = float(tr[:self.period].mean())
+            res[self.period - 1] = seed
+            res[self.period:] = _ema_series(tr[self.period:],
+                                            1 / self.period, seed)
+            self.value = float(res[-1])
+        return res
+
+
+class Volatility():
+    '''Rolling standard deviation of close log returns'''
+
+    def __init__(self, period: int = 20) -> None:
+        self.period = period
+        self.prev_close = math.nan
+        self.window: deque = deque(maxlen=period)
+        self.total = 0.
+        self.total_sq = 0.
+        self.value = math.nan
+
+    def update(self, candle: Candle) -> float:
+        if not math.isnan(self.prev_close):
+            r = math.log(candle.close / self.prev_close)
+            if len(self.window) == self.period:
+                old = self.window[0]
+                self.total -= old
+                self.total_sq -= old * old
+            self.window.append(r)
+            self.total += r
+            self.total_sq += r * r
+            if len(self.window) == self.period:
+                mean = self.total / self.period
+                self.value = math.sqrt(max(
+                    self.total_sq / self.period - mean * mean, 0.))
+        self.prev_close = candle.close
+        return self.value
+
+    def backfill(self, candles: Candles) -> np.ndarray:
+        close = candles.close
+        res = np.full(len(close), np.nan)
+        r = np.diff(np.log(close))
+        if len(r) >= self.period:
+            windows = np.lib.stride_tricks.sliding_window_view(r,
+                                                               self.period)
+            res[self.period:] = windows.std(axis=1)
+            self.value = float(res[-1])
+        self.window = deque(r[-self.period:].tolist(), maxlen=self.period)
+        self.total = float(sum(self.window))
+        self.total_sq = float(sum(v * v for v in self.window))
+        self.prev_close = float(close[-1]) if len(close) else math.nan
+        return res
+
+
+class VWAP():
+    '''
+    Volume weighted average of typical price (high + low + close) / 3
+    over last period candles, or over all candles if period is None
+    '''
+
+    def __init__(self, period: int = None) -> None:
+        self.period = period
+        self.window: deque = deque(maxlen=period)
+        self.pv = 0.
+        self.volume = 0.
+        self.value = math.nan
+
+    def update(self, candle: Candle) -> float:
+        pv = (candle.high + candle.low + candle.close) / 3 * candle.volume
+        if self.period and len(self.window) == self.period:
+            old_pv, old_volume = self.window[0]
+            self.pv -= old_pv
+            self.volume -= old_volume
+        if self.period:
+            self.window.append((pv, candle.volume))
+        self.pv += pv
+        self.volume += candle.volume
+        self.value = self.pv / self.volume if self.volume else math.nan
+        return self.value
+
+    def backfill(self, candles: Candles) -> np.ndarray:
+        pv = (candles.high + candles.low + candles.close) / 3 * \
+            candles.volume
+        cum_pv = np.concatenate(([0.], np.cumsum(pv)))
+        cum_volume = np.concatenate(([0.], np.cumsum(candles.volume)))
+        if self.period:
+            start = np.maximum(np.arange(1, len(pv) + 1) - self.period, 0)
+            window_pv = cum_pv[1:] - cum_pv[start]
+            window_volume = cum_volume[1:] - cum_volume[start]
+            self.window = deque(zip(pv[-self.period:].tolist(),
+                                    candles.volume[-self.period:].tolist()),
+                                maxlen=self.period)
+        else:
+            window_pv, window_volume = cum_pv[1:], cum_volume[1:]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            res = np.where(window_volume != 0,
+                           window_pv / window_volume, np.nan)
+        self.pv = float(window_pv[-1]) if len(pv) else 0.
+        self.volume = float(window_volume[-1]) if len(pv) else 0.
+        self.value = float(res[-1]) if len(res) else math.nan
+        return res
+
+
+def trailing_stop_by_atr(atr: float,
+                         activation_price: MarketPosition,
+                         multiplier: float = 2.,
+                         active: bool = True) -> TrailingStop:
+    '''
+    TrailingStop with distance of multiplier * ATR.
+    Fit it with SimpleOrder.fit_market_positions() before sending.
+    '''
+    return TrailingStop(distance=MarketPosition(0, ED(atr * multiplier)),
+                        activation_price=activation_price,
+                        active=active and not math.isnan(atr))
@@ -0,0 +1,332 @@
+'''
+Synthetic signal load generator and soak test harness.
+
+SignalGenerator synthesises adviser messages, SignalPipeline drives each
+of them through the production path:
+1. AdviserPrediction parsing (templates or generic).
+2. Sizing by risk per signal.
+3. SimpleOrder construction and fitting by pre-armed instruments.
+4. place_order and partial TP/SL on FakeExchange.
+5. Current price updates of live orders from TickerSnapshot.
+SoakTest sends signals at a fixed rate and reports throughput, latency
+percentiles, RSS and number of live objects per interval, so slowdowns
+and leaks show up as trends.
+'''
+import gc
+import os
+import time
+import logging
+
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Callable
+from pybit.unified_trading import HTTP
+
+from crypto_math import ED
+from market_utils import OrderCategory, MarketPosition
+from advparser import AdviserPrediction
+from advparser.templates import TemplateRegistry, default_registry
+from prearm import OrderArmory
+from simpleorder import SimpleOrder
+from tickers import TickerSnapshot
+from loadgen.signals import Signal, SignalGenerator, DEFAULT_SYMBOLS, \
+    FORMATS
+from loadgen.exchange import FakeExchange
+from loadgen.exceptions import ErrorSignalMismatch
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def rss_bytes() -> int:
+    '''
+    Current resident set size of the process. Falls back to peak RSS
+    where /proc is not available, 0 if neither is.
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is None:
+        return 0
+    # Kilobytes on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if os.uname().sysname == 'Darwin' else maxrss * 1024
+
+
+def size_prediction(prediction: AdviserPrediction, risk: ED) -> dict:
+    '''
+    Sizes order so that the farthest stop loss loses risk.
+    Open price is the middle of open range, TP and SL levels are
+    ordered from the nearest to the farthest one and share qty equally.
+    '''
+    open_price = ED(sum(prediction.opens) / len(prediction.opens))
+    qty = ED(risk / max(abs(open_price - sl)
+                        for sl in prediction.stop_losses))
+
+    def levels(prices: list[ED]) -> list[MarketPosition]:
+        prices = sorted(prices, key=lambda price: abs(price - open_price))
+        return [MarketPosition(qty / len(prices), price)
+                for price in prices]
+
+    return dict(side=prediction.side,
+                open=MarketPosition(qty, open_price),
+                stop_losses=levels(prediction.stop_losses),
+                take_profits=levels(prediction.take_profits))
+
+
+class SignalPipeline():
+    '''
+    Processes signals one by one as the bot does and keeps the last
+    live_orders orders alive for price updates
+    '''
+
+    def __init__(self,
+                 session: HTTP,
+                 category: OrderCategory = OrderCategory.LINEAR,
+                 watchlist: list[str] = (),
+                 risk: ED = ED(10),
+                 live_orders: int = 1000,
+                 updates_per_signal: int = 5,
+                 registry: TemplateRegistry = default_registry,
+                 verify: bool = True) -> None:
+        '''
+        watchlist: symbols armed by the first signal, others are
+            armed when they first appear
+        risk: loss at the farthest stop loss in quote coin
+        updates_per_signal: live orders updated from snapshot per signal
+        verify: compare parsed prediction with generated values
+        '''
+        self.session = session
+        self.category = category
+        self.risk = ED(risk)
+        self.updates_per_signal = updates_per_signal
+        self.registry = registry
+        self.verify = verify
+
+        self.snapshot = TickerSnapshot(session, category)
+        self.armory = OrderArmory(category=category,
+                                  watchlist=watchlist,
+                                  snapshot=self.snapshot)
+        self.live: deque[SimpleOrder] = deque(maxlen=live_orders)
+        self._next_update = 0
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.category=}, '\
+            f'{self.risk=}, {len(self.live)=})'
+
+    def parse(self, signal: Signal) -> AdviserPrediction:
+        prediction = AdviserPrediction(adviser=signal.adviser,
+                                       prediction_text=signal.text,
+                                       registry=self.registry)
+        if self.verify and (
+                prediction.side != signal.side or
+                prediction.opens != signal.opens or
+                prediction.take_profits != signal.take_profits or
+                prediction.stop_losses != signal.stop_losses):
+            logger.error(f'Parsed {prediction} does not match {signal}')
+            raise ErrorSignalMismatch(signal.format)
+        return prediction
+
+    def process(self, signal: Signal) -> SimpleOrder:
+        prediction = self.parse(signal)
+        symbol = prediction.symbol or signal.symbol
+
+        if self.armory.get(symbol) is None:
+            # Armed symbols expire, re-arm the whole watchlist at once
+            self.armory.watchlist.add(symbol)
+            self.armory.api_arm(self.session)
+        so = self.armory.build_order(symbol=symbol,
+                                     adviser=signal.adviser,
+                                     **size_prediction(prediction,
+                                                       self.risk))
+        self.armory.place(self.session, so)
+        so.api_set_trading_stop(self.session)
+        self.live.append(so)
+
+        self.update_live()
+        return so
+
+    def update_live(self) -> None:
+        '''Updates current price of next live orders round robin'''
+        if not self.live:
+            return
+        self.snapshot.refresh_if_stale()
+        for _ in range(min(self.updates_per_signal, len(self.live))):
+            self._next_update %= len(self.live)
+            self.live[self._next_update].update_current_price(self.snapshot)
+            self._next_update += 1
+
+
+@dataclass
+class SoakSample():
+    '''Statistics of one report interval'''
+    elapsed: float = field(default=0.)
+    messages: int = field(default=0)
+    throughput: float = field(default=0.)
+    p50: float = field(default=0.)
+    p90: float = field(default=0.)
+    p99: float = field(default=0.)
+    max: float = field(default=0.)
+    rss: int = field(default=0)
+    objects: int = field(default=0)
+    errors: int = field(default=0)
+
+    def __str__(self) -> str:
+        return f'{self.elapsed:8.1f}s {self.messages:7d} msg '\
+            f'{self.throughput:8.1f} msg/s '\
+            f'p50={self.p50 * 1e3:7.2f} p90={self.p90 * 1e3:7.2f} '\
+            f'p99={self.p99 * 1e3:7.2f} max={self.max * 1e3:7.2f} ms '\
+            f'rss={self.rss / 2 ** 20:7.1f} MiB '\
+            f'objects={self.objects} errors={self.errors}'
+
+
+@dataclass
+class SoakReport():
+    samples: list[SoakSample] = field(default_factory=list)
+    errors: Counter = field(default_factory=Counter)
+    messages: int = field(default=0)
+    elapsed: float = field(default=0.)
+
+    @property
+    def throughput(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.
+
+    @property
+    def worst_p99(self) -> float:
+        return max((s.p99 for s in self.samples), default=0.)
+
+    @property
+    def rss_growth(self) -> int:
+        '''RSS of the last interval against the first one'''
+        if len(self.samples) < 2:
+            return 0
+        return self.samples[-1].rss - self.samples[0].rss
+
+    @property
+    def objects_growth(self) -> int:
+        if len(self.samples) < 2:
+            return 0
+        return self.samples[-1].objects - self.samples[0].objects
+
+    def __str__(self) -> str:
+        return f'{self.messages} messages in {self.elapsed:.1f}s '\
+            f'{self.throughput:.1f} msg/s '\
+            f'worst p99={self.worst_p99 * 1e3:.2f} ms '\
+            f'rss growth={self.rss_growth / 2 ** 20:.1f} MiB '\
+            f'objects growth={self.objects_growth} '\
+            f'errors={dict(self.errors)}'
+
+
+def _percentile(values: list[float], q: float) -> float:
+    '''q-th percentile of sorted values by nearest rank'''
+    if not values:
+        return 0.
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class SoakTest():
+    '''
+    Open loop load: signal i is due at start + i / rate no matter how
+    long previous signals took, and its latency is counted from that
+    moment. So queueing behind slow signals shows up in percentiles
+    instead of silently lowering the rate. rate=0 sends as fast as
+    possible.
+    '''
+
+    def __init__(self,
+                 generator: SignalGenerator,
+                 pipeline: SignalPipeline,
+                 rate: float = 100.,
+                 report_interval: float = 10.,
+                 count_objects: bool = True,
+                 clock: Callable[[], float] = time.perf_counter,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        '''
+        count_objects: count objects tracked by gc every interval,
+            it costs a full heap walk
+        '''
+        self.generator = generator
+        self.pipeline = pipeline
+        self.rate = rate
+        self.report_interval = report_interval
+        self.count_objects = count_objects
+        self.clock = clock
+        self.sleep = sleep
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.rate=}, '\
+            f'{self.report_interval=})'
+
+    def run(self, duration: float = None, messages: int = None,
+            on_sample: Callable[[SoakSample], None] = None) -> SoakReport:
+        '''Runs until duration seconds passed or messages were sent'''
+        if duration is None and messages is None:
+            raise ValueError('duration or messages is required')
+        report = SoakReport()
+        latencies: list[float] = []
+        errors = 0
+        start = self.clock()
+        interval_start = start
+        sent = 0
+
+        while True:
+            now = self.clock()
+            if (duration is not None and now - start >= duration) or \
+                    (messages is not None and sent >= messages):
+                break
+
+            due = start + sent / self.rate if self.rate else now
+            if due > now:
+                self.sleep(due - now)
+            signal = self.generator.next()
+            try:
+                self.pipeline.process(signal)
+            except Exception as e:
+                errors += 1
+                report.errors[e.__class__.__name__] += 1
+            finished = self.clock()
+            latencies.append(finished - due)
+            sent += 1
+
+            if finished - interval_start >= self.report_interval:
+                sample = self._sample(finished - start,
+                                      finished - interval_start,
+                                      latencies, errors)
+                report.samples.append(sample)
+                if on_sample is not None:
+                    on_sample(sample)
+                latencies, errors = [], 0
+                interval_start = finished
+
+        end = self.clock()
+        if latencies:
+            sample = self._sample(end - start, end - interval_start,
+                                  latencies, errors)
+            report.samples.append(sample)
+            if on_sample is not None:
+                on_sample(sample)
+        report.messages = sent
+        report.elapsed = end - start
+        logger.info(f'{self} finished: {report}')
+        return report
+
+    def _sample(self, elapsed: float, interval: float,
+                latencies: list[float], errors: int) -> SoakSample:
+        latencies.sort()
+        return SoakSample(
+            elapsed=elapsed,
+            messages=len(latencies),
+            throughput=len(latencies) / interval if interval else 0.,
+            p50=_percentile(latencies, 50),
+            p90=_percentile(latencies, 90),
+            p99=_percentile(latencies, 99),
+            max=latencies[-1],
+            rss=rss_bytes(),
+            objects=len(gc.get_objects()) if self.count_objects else 0,
+            errors=errors)
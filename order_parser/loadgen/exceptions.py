@@ -0,0 +1,2 @@
+class ErrorSignalMismatch(Exception):
+    pass
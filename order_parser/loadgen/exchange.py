@@ -0,0 +1,117 @@
+import time
+import random
+import logging
+
+from collections import Counter, deque
+
+from loadgen.signals import DEFAULT_SYMBOLS
+
+logger = logging.getLogger(__name__)
+
+
+class FakeExchange():
+    '''
+    In-memory stand-in for pybit HTTP session serving the calls of
+    the order pipeline: instruments info pages, tickers, place_order
+    and set_trading_stop.
+    1. Mark prices random walk on every tickers request.
+    2. Optional latency is added to every request.
+    3. Only counters and the last placed orders are kept, so the
+       exchange itself does not grow during soak runs.
+    '''
+
+    def __init__(self,
+                 symbols: dict[str, tuple[float, int]] = None,
+                 latency: float = 0.,
+                 reject_rate: float = 0.,
+                 page_size: int = 500,
+                 keep_orders: int = 100,
+                 seed: int = None) -> None:
+        '''
+        reject_rate: share of place_order calls answered with API error
+        '''
+        self.symbols = dict(symbols or DEFAULT_SYMBOLS)
+        self.latency = latency
+        self.reject_rate = reject_rate
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.prices = {symbol: base
+                       for symbol, (base, _) in self.symbols.items()}
+        self.instruments = [self.instrument_info(symbol)
+                            for symbol in self.symbols]
+        self.calls: Counter = Counter()
+        self.orders: deque = deque(maxlen=keep_orders)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self.symbols)=}, '\
+            f'{self.latency=}, {self.reject_rate=})'
+
+    def instrument_info(self, symbol: str) -> dict:
+        '''Instrument with tick size by price decimals of symbol'''
+        base, decimals = self.symbols[symbol]
+        tick_size = f'{10 ** -decimals:.{decimals}f}'
+        qty_decimals = max(0, 5 - len(str(int(base))))
+        qty_step = f'{10 ** -qty_decimals:.{qty_decimals}f}'
+        return {
+            'symbol': symbol,
+            'launchTime': '1640749024000',
+            'deliveryTime': '0',
+            'deliveryFeeRate': '',
+            'priceScale': str(decimals),
+            'leverageFilter': {'minLeverage': '1',
+                               'maxLeverage': '50.00',
+                               'leverageStep': '0.01'},
+            'priceFilter': {'minPrice': tick_size,
+                            'maxPrice': f'{base * 100:.{decimals}f}',
+                            'tickSize': tick_size},
+            'lotSizeFilter': {'maxOrderQty': '100000000',
+                              'minOrderQty': qty_step,
+                              'qtyStep': qty_step,
+                              'postOnlyMaxOrderQty': '100000000'},
+            'fundingInterval': 480,
+        }
+
+    def _request(self, name: str) -> None:
+        self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_instruments_info(self, category: str, symbol: str = None,
+                             limit: int = 500, cursor: str = '') -> dict:
+        self._request('get_instruments_info')
+        instruments = [i for i in self.instruments
+                       if symbol is None or i['symbol'] == symbol]
+        start = int(cursor or 0)
+        end = start + min(limit, self.page_size)
+        return {'retCode': 0,
+                'result': {'category': category,
+                           'list': instruments[start:end],
+                           'nextPageCursor': str(end)
+                           if end < len(instruments) else ''}}
+
+    def get_tickers(self, category: str, symbol: str = None) -> dict:
+        self._request('get_tickers')
+        tickers = []
+        for name, (base, decimals) in self.symbols.items():
+            price = self.prices[name] * (1 + self.random.gauss(0, 0.001))
+            price = self.prices[name] = min(max(price, base / 2), base * 2)
+            if symbol in (None, name):
+                tickers.append({'symbol': name,
+                                'markPrice': f'{price:.{decimals}f}'})
+        return {'retCode': 0,
+                'result': {'category': category, 'list': tickers}}
+
+    def place_order(self, **kwargs) -> dict:
+        self._request('place_order')
+        if self.random.random() < self.reject_rate:
+            return {'retCode': 110007, 'retMsg': 'Insufficient balance',
+                    'result': {}}
+        order_id = f'ext-{self.calls["place_order"]}'
+        self.orders.append((order_id, kwargs))
+        return {'retCode': 0,
+                'result': {'orderId': order_id,
+                           'orderLinkId': kwargs.get('orderLinkId', '')}}
+
+    def set_trading_stop(self, **kwargs) -> dict:
+        self._request('set_trading_stop')
+        return {'retCode': 0, 'result': {}}
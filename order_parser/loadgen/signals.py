@@ -0,0 +1,173 @@
+import random
+import logging
+
+from typing import NamedTuple
+
+from crypto_math import ED
+from market_utils import OrderSide
+
+logger = logging.getLogger(__name__)
+
+# symbol -> (base price, price decimals)
+DEFAULT_SYMBOLS = {
+    'BTCUSDT': (27000., 1),
+    'ETHUSDT': (1850., 2),
+    'SOLUSDT': (19.18, 3),
+    'LINKUSDT': (6.342, 3),
+    'XRPUSDT': (0.5123, 4),
+    'DOGEUSDT': (0.06123, 5),
+    'PEOPLEUSDT': (0.02001, 5),
+}
+
+FORMATS = ('hashtag', 'point', 'generic')
+
+
+class Signal(NamedTuple):
+    '''Synthetic adviser message with values it has to be parsed to'''
+    adviser: str
+    text: str
+    format: str
+    symbol: str
+    side: OrderSide
+    opens: list[ED]
+    take_profits: list[ED]
+    stop_losses: list[ED]
+
+
+class SignalGenerator():
+    '''
+    Synthesises adviser messages in the layouts AdviserPrediction
+    understands:
+    1. hashtag: "#LINK/USDT - LONG", "Открытие - a-b", numbered "Цели",
+       "Плечо - х20", "Стоп".
+    2. point: "SOL | USDT = SHORT", "Точка входа", "Тейк-профит: a | b",
+       "Кредитное плечо: 50x", "Стоп-лосс".
+    3. generic: free form lines with English or Russian keywords,
+       which only parse_generic() understands.
+    Prices random walk around base price of every symbol.
+    '''
+
+    def __init__(self,
+                 symbols: dict[str, tuple[float, int]] = None,
+                 formats: tuple[str, ...] = FORMATS,
+                 advisers: int = 10,
+                 max_take_profits: int = 4,
+                 seed: int = None) -> None:
+        '''
+        advisers: number of distinct adviser names per format
+        max_take_profits: at most 4, generic parsing strips enumeration
+            of targets 1- to 4- only
+        '''
+        self.symbols = dict(symbols or DEFAULT_SYMBOLS)
+        self.formats = formats
+        self.advisers = advisers
+        self.max_take_profits = min(max_take_profits, 4)
+        self.random = random.Random(seed)
+        self.prices = {symbol: base
+                       for symbol, (base, _) in self.symbols.items()}
+        self.generated = 0
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({len(self.symbols)=}, '\
+            f'{self.formats=}, {self.generated=})'
+
+    def __iter__(self):
+        while True:
+            yield self.next()
+
+    def _walk(self, symbol: str) -> float:
+        base = self.symbols[symbol][0]
+        price = self.prices[symbol] * (1 + self.random.gauss(0, 0.005))
+        # Keep walk around base price
+        price = min(max(price, base / 2), base * 2)
+        self.prices[symbol] = price
+        return price
+
+    def _levels(self, symbol: str, side: OrderSide) -> tuple[list[str], ...]:
+        '''Returns formatted opens, take profits and stop losses'''
+        decimals = self.symbols[symbol][1]
+        sign = 1 if side == OrderSide.BUY else -1
+        price = self._walk(symbol)
+
+        def fmt(val: float) -> str:
+            return f'{val:.{decimals}f}'
+
+        opens = [fmt(price)]
+        if self.random.random() < 0.5:
+            opens.append(fmt(price * (1 - sign * self.random.uniform(
+                0.002, 0.01))))
+        take_profits = []
+        level = price
+        for _ in range(self.random.randint(1, self.max_take_profits)):
+            level *= 1 + sign * self.random.uniform(0.005, 0.03)
+            take_profits.append(fmt(level))
+        stop_losses = [fmt(price * (1 - sign * self.random.uniform(
+            0.02, 0.05)))]
+        return opens, take_profits, stop_losses
+
+    def next(self) -> Signal:
+        symbol = self.random.choice(list(self.symbols))
+        side = self.random.choice((OrderSide.BUY, OrderSide.SELL))
+        layout = self.random.choice(self.formats)
+        opens, take_profits, stop_losses = self._levels(symbol, side)
+        text = getattr(self, f'_{layout}')(symbol, side, opens,
+                                           take_profits, stop_losses)
+        self.generated += 1
+        return Signal(
+            adviser=f'{layout}-{self.random.randrange(self.advisers)}',
+            text=text,
+            format=layout,
+            symbol=symbol,
+            side=side,
+            opens=sorted(map(ED, opens)),
+            take_profits=sorted(map(ED, take_profits)),
+            stop_losses=sorted(map(ED, stop_losses)))
+
+    def _hashtag(self, symbol: str, side: OrderSide, opens: list[str],
+                 take_profits: list[str], stop_losses: list[str]) -> str:
+        direction = 'LONG📈' if side == OrderSide.BUY else 'SHORT📉'
+        targets = ' '.join(f'{num}-{tp}' for num, tp
+                           in enumerate(take_profits, start=1))
+        return f'''
+    🎈 #{symbol[:-4]}/USDT - {direction}
+
+    🟢 Открытие - {'-'.join(opens)}
+
+    ✅ Цели - {targets}
+
+    ♾ - Плечо - х{self.random.choice((5, 10, 20, 50))} (Cross)
+
+    🔴 Стоп - {stop_losses[0]}
+    '''
+
+    def _point(self, symbol: str, side: OrderSide, opens: list[str],
+               take_profits: list[str], stop_losses: list[str]) -> str:
+        direction = 'LONG' if side == OrderSide.BUY else 'SHORT'
+        return f'''
+    {symbol[:-4]} | USDT = {direction}
+
+    Точка входа: {' - '.join(opens)}
+    Тейк-профит: {' | '.join(take_profits)}
+    Кредитное плечо: {self.random.choice((10, 25, 50))}x
+    Стоп-лосс: {stop_losses[0]}
+    '''
+
+    def _generic(self, symbol: str, side: OrderSide, opens: list[str],
+                 take_profits: list[str], stop_losses: list[str]) -> str:
+        direction = self.random.choice(
+            ('Buy', 'Long') if side == OrderSide.BUY else ('Sell', 'Short'))
+        if self.random.random() < 0.5:
+            return f'''
+    {direction} {symbol}
+    Open {'-'.join(opens)}
+    TP {' '.join(take_profits)}
+    SL {stop_losses[0]}
+    '''
+        targets = ' '.join(f'{num}-{tp}' for num, tp
+                           in enumerate(take_profits, start=1))
+        return f'''
+    {direction.upper()} {symbol}
+    Точка входа {'-'.join(opens)}
+    Цели {targets}
+    Стоп {stop_losses[0]}
+    '''
@@ -2,3 +2,4 @@ from market_utils.instrument import LeverageFilter, PriceFilter, \
     LotSizeFilter, InstrumentInfo
 from market_utils.order_details import OrderSide, OrderCategory, OrderType, \
     MarketPosition
+from market_utils.ladder import PositionLadder
@@ -23,7 +23,6 @@ class PriceFilter(BaseModel):
 
     @validator('*')
     def cast_to_ED_type(cls, v):
-        print(v)
         return ED(v)
 
     class Config():
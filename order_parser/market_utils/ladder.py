@@ -0,0 +1,134 @@
+import numpy as np
+
+from crypto_math import ED
+from .order_details import MarketPosition
+
+
+class PositionLadder():
+    '''
+    1. Class keeps TP or SL ladder of one order in one contiguous
+       float64 array: one row per level, one column per attribute.
+    2. Deltas are calculated relative to open and current MarketPosition
+       in one vectorized pass by update().
+    3. Dict views {level: MarketPosition} and max_open_value() are
+       calculated on request with exact MarketPosition arithmetic
+       against open and current of the last update(), so they carry
+       no float rounding.
+    '''
+
+    # Columns of the ladder array
+    LEVEL_PRICE = 0
+    LEVEL_QTY = 1
+    OPEN_QTY = 2
+    OPEN_PRICE = 3
+    OPEN_VALUE = 4
+    OPEN_ROI = 5
+    CURRENT_QTY = 6
+    CURRENT_PRICE = 7
+    CURRENT_VALUE = 8
+    CURRENT_ROI = 9
+    COLUMNS = 10
+
+    __slots__ = ('levels', 'direction', 'data', 'open', 'current')
+
+    def __init__(self, direction: int = 1) -> None:
+        '''
+        direction=1 means delta is base - level (BUY losses, SELL profits),
+        direction=-1 means delta is level - base (BUY profits, SELL losses)
+        '''
+        self.levels: list[MarketPosition] = []
+        self.direction = direction
+        self.data = np.zeros((0, self.COLUMNS), dtype=np.float64)
+        # Copies of open and current the ladder was calculated against,
+        # set together with levels
+        self.open: MarketPosition = None
+        self.current: MarketPosition = None
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.direction=}, '\
+            f'{self.levels=})'
+
+    def clear(self) -> None:
+        self.levels = []
+        self.data = np.zeros((0, self.COLUMNS), dtype=np.float64)
+
+    def update(self,
+               levels: list[MarketPosition],
+               open: MarketPosition,
+               current: MarketPosition,
+               direction: int = None) -> None:
+        '''
+        Recalculates deltas of all levels relative to open and current
+        '''
+        if direction is not None:
+            self.direction = direction
+        self.levels = list(levels)
+        self.open = MarketPosition.from_values(open.qty, open.price,
+                                               open.value)
+        self.current = MarketPosition.from_values(current.qty, current.price,
+                                                  current.value)
+
+        data = np.empty((len(self.levels), self.COLUMNS), dtype=np.float64)
+        data[:, self.LEVEL_PRICE] = [float(lvl.price) for lvl in self.levels]
+        data[:, self.LEVEL_QTY] = [float(lvl.qty) for lvl in self.levels]
+        level_values = data[:, self.LEVEL_PRICE] * data[:, self.LEVEL_QTY]
+        open_value = float(open.value)
+
+        for base, qty_col, price_col, value_col, roi_col in (
+                (open, self.OPEN_QTY, self.OPEN_PRICE,
+                 self.OPEN_VALUE, self.OPEN_ROI),
+                (current, self.CURRENT_QTY, self.CURRENT_PRICE,
+                 self.CURRENT_VALUE, self.CURRENT_ROI)):
+            qty = self.direction * (float(base.qty) - data[:, self.LEVEL_QTY])
+            value = self.direction * (float(base.value) - level_values)
+            price = np.divide(value, qty,
+                              out=np.zeros_like(value), where=qty != 0)
+            data[:, qty_col] = qty
+            data[:, price_col] = price
+            data[:, value_col] = value
+            data[:, roi_col] = value / open_value if open_value != 0 else 0
+
+        self.data = data
+
+    @property
+    def open_values(self) -> np.ndarray:
+        return self.data[:, self.OPEN_VALUE]
+
+    @property
+    def current_values(self) -> np.ndarray:
+        return self.data[:, self.CURRENT_VALUE]
+
+    @property
+    def open_rois(self) -> np.ndarray:
+        return self.data[:, self.OPEN_ROI]
+
+    @property
+    def current_rois(self) -> np.ndarray:
+        return self.data[:, self.CURRENT_ROI]
+
+    def max_open_value(self) -> ED:
+        '''Exact max of deltas values relative to open'''
+        if not self.levels:
+            return ED(0)
+        return ED(max(self.direction * (self.open.value - level.value)
+                      for level in self.levels))
+
+    def _delta(self, base: MarketPosition,
+               level: MarketPosition) -> MarketPosition:
+        delta = base - level if self.direction > 0 else level - base
+        delta.roi = delta.value / self.open.value \
+            if self.open.value != 0 else 0
+        return delta
+
+    def open_dict(self) -> dict[MarketPosition, MarketPosition]:
+        '''Returns {level: delta relative to open} view'''
+        return {level: self._delta(self.open, level)
+                for level in self.levels}
+
+    def current_dict(self) -> dict[MarketPosition, MarketPosition]:
+        '''Returns {level: delta relative to current} view'''
+        return {level: self._delta(self.current, level)
+                for level in self.levels}
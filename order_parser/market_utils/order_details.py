@@ -73,6 +73,16 @@ class MarketPosition():
         self.qty = qty
         self.price = price
 
+    @classmethod
+    def from_values(cls, qty: ED, price: ED, value: ED):
+        '''
+        Builds position from already calculated ED values
+        without recalculating value
+        '''
+        res = cls.__new__(cls)
+        res.__qty, res.__price, res.__value = qty, price, value
+        return res
+
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}({self.qty=}, '\
             f'{self.price=}, {self.value=})'
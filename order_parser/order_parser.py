@@ -11,6 +11,7 @@ import config
 from market_utils import OrderSide, OrderCategory, OrderType, \
     MarketPosition
 from advparser import AdviserPrediction
+from profiling import profiler
 
 # from advparser import AdviserPrediction
 
@@ -84,4 +85,7 @@ if __name__ == '__main__':
         Formatter(fmt='[%(asctime)s: %(levelname)s] %(message)s'))
     logger.addHandler(handler)
 
+    # kill -USR1 <pid> toggles 30 seconds of CPU and allocation profiling
+    profiler.install_signal()
+
     parse_advise()
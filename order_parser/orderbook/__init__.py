@@ -0,0 +1,193 @@
+import logging
+
+from dataclasses import dataclass
+from pybit.unified_trading import HTTP
+
+import numpy as np
+
+from market_utils import OrderSide, OrderCategory
+from orderbook.exceptions import ErrorGetOrderBook, ErrorOrderBookMessage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SlippageEstimate():
+    '''Expected market order fill against order book'''
+    side: OrderSide
+    qty: float              # Requested qty
+    filled_qty: float       # Qty available in the book, <= qty
+    best_price: float       # Top of the book
+    avg_price: float        # Expected average fill price
+    worst_price: float      # Price of the deepest touched level
+    slippage: float         # Relative adverse move of avg against best
+
+    @property
+    def complete(self) -> bool:
+        return self.filled_qty >= self.qty
+
+
+class BookSide():
+    '''
+    One side of L2 order book as price/size arrays sorted from best
+    to worst price with cumulative qty and notional for O(log n) fills
+    '''
+
+    __slots__ = ('prices', 'sizes', 'cum_qty', 'cum_notional')
+
+    def __init__(self, levels: dict[float, float], descending: bool) -> None:
+        prices = np.fromiter(levels.keys(), dtype=np.float64,
+                             count=len(levels))
+        sizes = np.fromiter(levels.values(), dtype=np.float64,
+                            count=len(levels))
+        order = np.argsort(-prices if descending else prices, kind='stable')
+        self.prices = prices[order]
+        self.sizes = sizes[order]
+        self.cum_qty = np.cumsum(self.sizes)
+        self.cum_notional = np.cumsum(self.prices * self.sizes)
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def depth(self) -> float:
+        return float(self.cum_qty[-1]) if len(self) else 0.
+
+    def fill(self, qty: float) -> tuple[float, float, float]:
+        '''Returns filled qty, notional and worst price for qty'''
+        if not len(self) or qty <= 0:
+            return 0., 0., float('nan')
+        idx = int(np.searchsorted(self.cum_qty, qty, side='left'))
+        if idx >= len(self):
+            return self.depth(), float(self.cum_notional[-1]), \
+                float(self.prices[-1])
+        prev_qty = self.cum_qty[idx - 1] if idx else 0.
+        prev_notional = self.cum_notional[idx - 1] if idx else 0.
+        notional = prev_notional + (qty - prev_qty) * self.prices[idx]
+        return qty, float(notional), float(self.prices[idx])
+
+
+class OrderBook():
+    '''
+    1. Class keeps L2 order book snapshot of one symbol in array form.
+    2. Book is loaded from session.get_orderbook() response or from
+       orderbook.{depth}.{symbol} stream snapshot and delta messages.
+    3. estimate() returns expected average fill and slippage of market
+       order with binary search over cumulative depth.
+    '''
+
+    def __init__(self, symbol: str = '') -> None:
+        self.symbol = symbol
+        self.update_id: int = 0
+        self.ts: int = 0
+        self._bids: dict[float, float] = {}
+        self._asks: dict[float, float] = {}
+        self.bids = BookSide({}, descending=True)
+        self.asks = BookSide({}, descending=False)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.symbol=}, '\
+            f'{self.update_id=}, {len(self.bids)=}, {len(self.asks)=})'
+
+    @staticmethod
+    def _levels(levels: list) -> dict[float, float]:
+        return {float(price): float(size) for price, size in levels}
+
+    def _rebuild(self) -> None:
+        self.bids = BookSide(self._bids, descending=True)
+        self.asks = BookSide(self._asks, descending=False)
+
+    def load_snapshot(self, data: dict) -> None:
+        '''Replaces book by snapshot {"s", "b", "a", "u", "ts"}'''
+        self.symbol = data.get('s', self.symbol)
+        self.update_id = int(data.get('u', 0))
+        self.ts = int(data.get('ts', 0))
+        self._bids = self._levels(data['b'])
+        self._asks = self._levels(data['a'])
+        self._rebuild()
+
+    def apply_delta(self, data: dict) -> None:
+        '''Applies stream delta, size 0 removes price level'''
+        for book, levels in ((self._bids, data.get('b', [])),
+                             (self._asks, data.get('a', []))):
+            for price, size in self._levels(levels).items():
+                if size == 0:
+                    book.pop(price, None)
+                else:
+                    book[price] = size
+        self.update_id = int(data.get('u', self.update_id))
+        self._rebuild()
+
+    def on_message(self, message: dict) -> None:
+        '''Handles orderbook stream message of snapshot or delta type'''
+        if message.get('type') == 'snapshot':
+            self.load_snapshot(message['data'])
+        elif message.get('type') == 'delta':
+            self.apply_delta(message['data'])
+        else:
+            raise ErrorOrderBookMessage(f'Unknown {message=}')
+        self.ts = int(message.get('ts', self.ts))
+
+    @classmethod
+    def from_response(cls, res: dict):
+        book = cls()
+        book.load_snapshot(res['result'])
+        return book
+
+    @classmethod
+    def api_fetch(cls, session: HTTP, category: OrderCategory,
+                  symbol: str, limit: int = 50):
+        '''Requests order book snapshot from exchange'''
+        try:
+            logger.debug(f'Requesting order book via '
+                         f'session.get_orderbook() for {symbol=}')
+            res = session.get_orderbook(category=category.value,
+                                        symbol=symbol,
+                                        limit=limit)
+            if res['retCode'] != 0:
+                logger.error(f'Get order book {symbol=} API error {res}')
+                raise ErrorGetOrderBook(res)
+            return cls.from_response(res)
+        except Exception as e:
+            logger.exception(f'Get order book {symbol=} exception {e}')
+            raise ErrorGetOrderBook
+
+    def side_for(self, side: OrderSide) -> BookSide:
+        '''Book side consumed by market order of side'''
+        return self.asks if side == OrderSide.BUY else self.bids
+
+    def estimate(self, side: OrderSide, qty: float) -> SlippageEstimate:
+        '''Expected fill of market order with qty'''
+        book_side = self.side_for(side)
+        qty = float(qty)
+        filled, notional, worst = book_side.fill(qty)
+        best = float(book_side.prices[0]) if len(book_side) else float('nan')
+        avg = notional / filled if filled else float('nan')
+        sign = 1 if side == OrderSide.BUY else -1
+        slippage = sign * (avg - best) / best if filled else float('inf')
+        return SlippageEstimate(side=side, qty=qty, filled_qty=filled,
+                                best_price=best, avg_price=avg,
+                                worst_price=worst, slippage=slippage)
+
+    def max_qty(self, side: OrderSide, max_slippage: float) -> float:
+        '''
+        Largest market order qty with average fill slippage
+        not worse than max_slippage
+        '''
+        book_side = self.side_for(side)
+        if not len(book_side):
+            return 0.
+        sign = 1 if side == OrderSide.BUY else -1
+        best = book_side.prices[0]
+        limit_avg = best * (1 + sign * max_slippage)
+        # Average price after fully taking every level
+        avg = book_side.cum_notional / book_side.cum_qty
+        fits = sign * (avg - limit_avg) <= 1e-12 * best
+        idx = int(np.argmin(fits)) if not fits.all() else len(book_side)
+        if idx == len(book_side):
+            return book_side.depth()
+        # Partially take level idx: (N + x*p) / (Q + x) = limit_avg
+        prev_qty = book_side.cum_qty[idx - 1] if idx else 0.
+        prev_notional = book_side.cum_notional[idx - 1] if idx else 0.
+        price = book_side.prices[idx]
+        extra = (limit_avg * prev_qty - prev_notional) / (price - limit_avg)
+        return float(prev_qty + max(extra, 0.))
@@ -0,0 +1,6 @@
+class ErrorGetOrderBook(Exception):
+    pass
+
+
+class ErrorOrderBookMessage(Exception):
+    pass
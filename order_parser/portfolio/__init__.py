@@ -0,0 +1,206 @@
+'''
+Vectorized risk aggregation over many SimpleOrders.
+
+Positions and TP/SL ladders of all orders are gathered into flat NumPy
+arrays once by rebuild(). On every price tick only current prices change,
+so update_prices() + calculate() recompute losses, profits, exposure and
+ROI of all orders in one pass without touching SimpleOrder objects.
+'''
+import logging
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from market_utils import OrderSide, PositionLadder
+from simpleorder import SimpleOrder
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RiskSummary():
+    '''Aggregated risk of a group of orders'''
+    orders: int = field(default=0)
+    open_value: float = field(default=0.)      # Sum of open values
+    exposure: float = field(default=0.)        # Sum of current values
+    net_exposure: float = field(default=0.)    # Long minus short values
+    pnl: float = field(default=0.)             # Unrealized profit
+    # Worst stop loss / best take profit relative to open
+    worst_loss: float = field(default=0.)
+    best_profit: float = field(default=0.)
+    # Worst stop loss / best take profit relative to current
+    current_worst_loss: float = field(default=0.)
+    current_best_profit: float = field(default=0.)
+
+    @property
+    def loss_roi(self) -> float:
+        return self.worst_loss / self.open_value if self.open_value else 0.
+
+    @property
+    def profit_roi(self) -> float:
+        return self.best_profit / self.open_value if self.open_value else 0.
+
+    @property
+    def pnl_roi(self) -> float:
+        return self.pnl / self.open_value if self.open_value else 0.
+
+    @property
+    def risk_rate(self) -> float:
+        return self.best_profit / self.worst_loss if self.worst_loss else 0.
+
+
+class Portfolio():
+    '''
+    1. rebuild() gathers orders into arrays, call it after orders or
+       their TP/SL ladders change.
+    2. update_prices() sets current prices by symbol.
+    3. calculate() computes per order arrays, totals() and by_*()
+       aggregate them.
+    '''
+
+    def __init__(self, orders: list[SimpleOrder] = None) -> None:
+        self.orders: list[SimpleOrder] = list(orders or [])
+        self.rebuild()
+
+    def add(self, order: SimpleOrder) -> None:
+        self.orders.append(order)
+        self.rebuild()
+
+    def remove(self, order: SimpleOrder) -> None:
+        self.orders.remove(order)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        '''Gathers positions and ladders of all orders into arrays'''
+        orders = self.orders
+        n = len(orders)
+
+        self.symbols, self.symbol_codes = np.unique(
+            np.array([so.symbol for so in orders], dtype=str),
+            return_inverse=True)
+        self.advisers, self.adviser_codes = np.unique(
+            np.array([so.adviser for so in orders], dtype=str),
+            return_inverse=True)
+        self.sides = np.array([side.value for side in OrderSide])
+        self.side_codes = np.array(
+            [list(OrderSide).index(so.side) for so in orders], dtype=np.intp)
+        # +1 for long, -1 for short
+        self.signs = np.where(
+            self.side_codes == list(OrderSide).index(OrderSide.BUY), 1., -1.)
+
+        self.open_qty = np.empty(n)
+        self.open_value = np.empty(n)
+        self.current_qty = np.empty(n)
+        self.current_price = np.empty(n)
+
+        loss_rows, profit_rows = [], []
+        loss_orders, profit_orders = [], []
+        for num, so in enumerate(orders):
+            so.update()
+            self.open_qty[num] = so.open.qty
+            self.open_value[num] = so.open.value
+            self.current_qty[num] = so.current.qty
+            self.current_price[num] = so.current.price
+            loss_rows.append(so.losses.data)
+            loss_orders.append(np.full(len(so.losses), num, dtype=np.intp))
+            profit_rows.append(so.profits.data)
+            profit_orders.append(np.full(len(so.profits), num, dtype=np.intp))
+
+        self.loss_orders, self.loss_values = self._gather_levels(
+            loss_rows, loss_orders)
+        self.profit_orders, self.profit_values = self._gather_levels(
+            profit_rows, profit_orders)
+        # Losses are base - level for long, profits are level - base
+        self.loss_signs = self.signs[self.loss_orders]
+        self.profit_signs = -self.signs[self.profit_orders]
+
+        self.calculate()
+
+    @staticmethod
+    def _gather_levels(rows: list[np.ndarray],
+                       orders: list[np.ndarray]) -> tuple[np.ndarray,
+                                                          np.ndarray]:
+        if not rows:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        data = np.concatenate(rows)
+        values = data[:, PositionLadder.LEVEL_PRICE] * \
+            data[:, PositionLadder.LEVEL_QTY]
+        return np.concatenate(orders), values
+
+    def update_prices(self, prices: dict) -> None:
+        '''
+        Sets current price of all orders by symbol -> price mapping,
+        e.g. TickerSnapshot.prices. Unknown symbols keep last price.
+        '''
+        symbol_prices = np.array(
+            [float(prices.get(symbol, np.nan)) for symbol in self.symbols])
+        order_prices = symbol_prices[self.symbol_codes]
+        self.current_price = np.where(np.isnan(order_prices),
+                                      self.current_price, order_prices)
+
+    def _max_by_order(self, orders: np.ndarray,
+                      values: np.ndarray) -> np.ndarray:
+        res = np.full(len(self.orders), -np.inf)
+        np.maximum.at(res, orders, values)
+        res[np.isneginf(res)] = 0.
+        return res
+
+    def calculate(self) -> None:
+        '''Calculates per order arrays for current prices'''
+        self.current_value = self.current_qty * self.current_price
+        self.pnl = self.signs * (self.current_value - self.open_value)
+
+        open_value = self.open_value[self.loss_orders]
+        current_value = self.current_value[self.loss_orders]
+        self.worst_loss = self._max_by_order(
+            self.loss_orders,
+            self.loss_signs * (open_value - self.loss_values))
+        self.current_worst_loss = self._max_by_order(
+            self.loss_orders,
+            self.loss_signs * (current_value - self.loss_values))
+
+        open_value = self.open_value[self.profit_orders]
+        current_value = self.current_value[self.profit_orders]
+        self.best_profit = self._max_by_order(
+            self.profit_orders,
+            self.profit_signs * (open_value - self.profit_values))
+        self.current_best_profit = self._max_by_order(
+            self.profit_orders,
+            self.profit_signs * (current_value - self.profit_values))
+
+    def _aggregate(self, codes: np.ndarray, keys) -> dict:
+        groups = len(keys)
+
+        def total(values: np.ndarray) -> np.ndarray:
+            return np.bincount(codes, weights=values, minlength=groups)
+
+        columns = {
+            'orders': np.bincount(codes, minlength=groups),
+            'open_value': total(self.open_value),
+            'exposure': total(self.current_value),
+            'net_exposure': total(self.signs * self.current_value),
+            'pnl': total(self.pnl),
+            'worst_loss': total(self.worst_loss),
+            'best_profit': total(self.best_profit),
+            'current_worst_loss': total(self.current_worst_loss),
+            'current_best_profit': total(self.current_best_profit),
+        }
+        return {str(key): RiskSummary(**{name: values[num].item()
+                                         for name, values in columns.items()})
+                for num, key in enumerate(keys)}
+
+    def totals(self) -> RiskSummary:
+        '''Risk of all orders'''
+        res = self._aggregate(np.zeros(len(self.orders), dtype=np.intp),
+                              ['total'])
+        return res['total']
+
+    def by_symbol(self) -> dict[str, RiskSummary]:
+        return self._aggregate(self.symbol_codes, self.symbols)
+
+    def by_side(self) -> dict[str, RiskSummary]:
+        return self._aggregate(self.side_codes, self.sides)
+
+    def by_adviser(self) -> dict[str, RiskSummary]:
+        return self._aggregate(self.adviser_codes, self.advisers)
@@ -0,0 +1,215 @@
+'''
+Pre-armed order templates for watched symbols.
+
+Instrument constraints of every watched symbol are fetched in advance
+with a few bulk session.get_instruments_info() calls, so on a signal
+SimpleOrder is built, fitted and placed with a single place_order call.
+Current price after placement comes from the armory's TickerSnapshot,
+without it api_place_order() follows up with its own get_tickers call.
+'''
+import time
+import logging
+
+from dataclasses import dataclass, field
+from typing import Callable
+from pybit.unified_trading import HTTP
+
+import crypto_math
+from crypto_math import ED
+from market_utils import OrderCategory, OrderSide, OrderType, \
+    MarketPosition, InstrumentInfo
+from simpleorder import SimpleOrder
+from simpleorder.exceptions import ErrorGetInstrumentInfo
+from tickers import TickerSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+class Quantizer():
+    '''Fits value to step, min and max resolved once from instrument'''
+
+    __slots__ = ('step', 'min_value', 'max_value')
+
+    def __init__(self, step: ED, min_value: ED, max_value: ED) -> None:
+        self.step = step
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def __call__(self, val: ED) -> ED:
+        return crypto_math.fit_to_chunk(val=val,
+                                        tick_size=self.step,
+                                        min_value=self.min_value,
+                                        max_value=self.max_value)
+
+
+@dataclass
+class ArmedSymbol():
+    '''Ready to send order template of one symbol'''
+    category: OrderCategory
+    instrument_info: InstrumentInfo
+    armed_at: float
+
+    price: Quantizer = field(init=False, repr=False)
+    qty: Quantizer = field(init=False, repr=False)
+    # Constant part of session.place_order() arguments
+    payload: dict = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        price_filter = self.instrument_info.priceFilter
+        lot_size_filter = self.instrument_info.lotSizeFilter
+        self.price = Quantizer(price_filter.tickSize,
+                               price_filter.minPrice,
+                               price_filter.maxPrice)
+        self.qty = Quantizer(lot_size_filter.qtyStep,
+                             lot_size_filter.minOrderQty,
+                             lot_size_filter.maxOrderQty)
+        self.payload = {'category': self.category.value,
+                        'symbol': self.symbol}
+
+    @property
+    def symbol(self) -> str:
+        return self.instrument_info.symbol
+
+    def fit(self, mp: MarketPosition) -> MarketPosition:
+        mp.price = self.price(mp.price)
+        mp.qty = self.qty(mp.qty)
+        return mp
+
+    def build_order(self,
+                    side: OrderSide,
+                    open: MarketPosition,
+                    stop_losses: list[MarketPosition] = None,
+                    take_profits: list[MarketPosition] = None,
+                    type: OrderType = OrderType.MARKET,
+                    adviser: str = '') -> SimpleOrder:
+        '''Builds SimpleOrder with all market positions already fitted'''
+        so = SimpleOrder(category=self.category,
+                         side=side,
+                         type=type,
+                         symbol=self.symbol,
+                         open=self.fit(open),
+                         stop_losses=[self.fit(mp)
+                                      for mp in stop_losses or []],
+                         take_profits=[self.fit(mp)
+                                       for mp in take_profits or []],
+                         adviser=adviser)
+        so.instrument_info = self.instrument_info
+        so.update()
+        return so
+
+    def place(self, session: HTTP, so: SimpleOrder,
+              snapshot: TickerSnapshot = None) -> None:
+        '''
+        Places order built by build_order(). It is one request if
+        snapshot is given and fresh, otherwise get_tickers follows.
+        '''
+        so.api_place_order(session, payload_base=self.payload,
+                           snapshot=snapshot)
+
+
+class OrderArmory():
+    '''
+    1. Class keeps ArmedSymbol for every symbol of watchlist.
+    2. Armed symbols older than max_age seconds are not returned,
+       so the signal falls back to the regular SimpleOrder flow.
+    3. Optional TickerSnapshot provides open price of market orders
+       if the signal has none, and current price after placement.
+       Its prices may be up to snapshot max_age seconds older than the
+       placement, which is acceptable for current price (risk views,
+       the next update_current_price() fixes it) but not for the fill
+       price. So open price of placed market orders is kept as sent,
+       not replaced by the snapshot price; exact entry price comes
+       with the position (e.g. reconcile). Keep max_age within the
+       price staleness tolerated by the risk views, seconds, not hours.
+    '''
+
+    def __init__(self,
+                 category: OrderCategory,
+                 watchlist: list[str],
+                 max_age: float = 3600,
+                 snapshot: TickerSnapshot = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.category = category
+        self.watchlist = set(watchlist)
+        self.max_age = max_age
+        self.snapshot = snapshot
+        self.clock = clock
+        self.armed: dict[str, ArmedSymbol] = {}
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.category=}, '\
+            f'{len(self.watchlist)=}, {len(self.armed)=})'
+
+    def arm(self, instrument_info: InstrumentInfo) -> ArmedSymbol:
+        armed = ArmedSymbol(category=self.category,
+                            instrument_info=instrument_info,
+                            armed_at=self.clock())
+        self.armed[armed.symbol] = armed
+        return armed
+
+    def api_arm(self, session: HTTP, limit: int = 1000) -> None:
+        '''
+        Arms all watched symbols by paginated bulk requests of
+        instruments info of the whole category
+        '''
+        found = set()
+        cursor = ''
+        try:
+            while True:
+                logger.debug('Requesting instruments info via '
+                             f'session.get_instruments_info() for {self}')
+                res = session.get_instruments_info(
+                    category=self.category.value,
+                    limit=limit,
+                    cursor=cursor)
+                if res['retCode'] != 0:
+                    logger.error(f'Arm {self} API error {res}')
+                    raise ErrorGetInstrumentInfo(res)
+
+                for info in res['result']['list']:
+                    if info['symbol'] in self.watchlist:
+                        self.arm(InstrumentInfo(**info))
+                        found.add(info['symbol'])
+
+                cursor = res['result'].get('nextPageCursor', '')
+                if not cursor or found == self.watchlist:
+                    break
+        except Exception as e:
+            logger.exception(f'Arm {self} exception {e}')
+            raise ErrorGetInstrumentInfo
+
+        missing = self.watchlist - found
+        if missing:
+            logger.warning(f'No instruments info for {missing=} in {self}')
+        logger.info(f'Armed {len(found)} symbols in {self}')
+
+    def get(self, symbol: str) -> ArmedSymbol:
+        '''Returns fresh ArmedSymbol or None'''
+        armed = self.armed.get(symbol)
+        if armed is None or self.clock() - armed.armed_at > self.max_age:
+            return None
+        return armed
+
+    def build_order(self, symbol: str, side: OrderSide,
+                    open: MarketPosition, **kwargs) -> SimpleOrder:
+        '''
+        Builds fitted SimpleOrder of armed symbol or returns None
+        if the symbol is not armed
+        '''
+        armed = self.get(symbol)
+        if armed is None:
+            return None
+        if open.price == 0 and self.snapshot is not None:
+            open.price = self.snapshot.get_mark_price(symbol)
+        return armed.build_order(side=side, open=open, **kwargs)
+
+    def place(self, session: HTTP, so: SimpleOrder) -> None:
+        '''
+        Places order of armed symbol. With fresh snapshot it is the
+        only request, otherwise get_tickers follows place_order.
+        '''
+        armed = self.get(so.symbol)
+        if armed is None:
+            so.api_place_order(session, snapshot=self.snapshot)
+        else:
+            armed.place(session, so, snapshot=self.snapshot)
@@ -0,0 +1,188 @@
+'''
+Runtime toggleable CPU sampling and allocation tracing.
+
+Profiler does nothing until started, so it may stay installed in
+production. When started (by SIGUSR1, control command or start()) for
+a window it:
+1. Samples stacks of all threads from a background thread and writes
+   them in folded format (flamegraph.pl, speedscope, inferno).
+2. Traces allocations with tracemalloc and writes top allocation sites.
+'''
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+import tracemalloc
+
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler():
+
+    def __init__(self,
+                 output_dir: str = 'profiles',
+                 interval: float = 0.005,
+                 trace_frames: int = 10,
+                 top_allocations: int = 30) -> None:
+        '''
+        interval: seconds between stack samples
+        trace_frames: frames kept by tracemalloc per allocation
+        '''
+        self.output_dir = output_dir
+        self.interval = interval
+        self.trace_frames = trace_frames
+        self.top_allocations = top_allocations
+
+        self.samples: Counter = Counter()
+        self.started_at: float = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread = None
+        self._timer: threading.Timer = None
+        self._lock = threading.Lock()
+        self._owns_tracemalloc = False
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.active=}, '\
+            f'{self.output_dir=}, {self.interval=})'
+
+    @property
+    def active(self) -> bool:
+        return self.started_at is not None
+
+    def start(self, duration: float = None) -> None:
+        '''Starts profiling, stops automatically after duration seconds'''
+        with self._lock:
+            if self.active:
+                logger.warning(f'{self} is already started')
+                return
+            self.samples = Counter()
+            self.started_at = time.time()
+            self._stop.clear()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._owns_tracemalloc = True
+            self._sampler = threading.Thread(target=self._sample,
+                                             name='profiler-sampler',
+                                             daemon=True)
+            self._sampler.start()
+            if duration:
+                self._timer = threading.Timer(duration, self.stop)
+                self._timer.daemon = True
+                self._timer.start()
+        logger.info(f'{self} started for {duration=}')
+
+    def stop(self) -> list[str]:
+        '''Stops profiling and writes reports. Returns written paths.'''
+        with self._lock:
+            if not self.active:
+                return []
+            self._stop.set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._sampler is not threading.current_thread():
+                self._sampler.join()
+            snapshot = tracemalloc.take_snapshot() \
+                if tracemalloc.is_tracing() else None
+            if self._owns_tracemalloc:
+                tracemalloc.stop()
+                self._owns_tracemalloc = False
+
+            stamp = time.strftime('%Y%m%d-%H%M%S',
+                                  time.localtime(self.started_at))
+            self.started_at = None
+            paths = [self.write_folded(stamp)]
+            if snapshot is not None:
+                paths.append(self.write_allocations(snapshot, stamp))
+        logger.info(f'{self} stopped, reports {paths}')
+        return paths
+
+    def toggle(self, duration: float = None) -> None:
+        if self.active:
+            self.stop()
+        else:
+            self.start(duration)
+
+    def control(self, command: str) -> str:
+        '''
+        Handles text command from control channel:
+        "start [seconds]", "stop" or "status"
+        '''
+        words = command.split()
+        if not words:
+            return 'empty command'
+        if words[0] == 'start':
+            self.start(float(words[1]) if len(words) > 1 else None)
+            return 'started'
+        if words[0] == 'stop':
+            return 'written ' + ' '.join(self.stop())
+        if words[0] == 'status':
+            return f'active for {time.time() - self.started_at:.1f}s' \
+                if self.active else 'inactive'
+        return f'unknown command {command!r}'
+
+    def install_signal(self, signum: int = None,
+                       duration: float = 30) -> None:
+        '''Toggles profiling on signal, SIGUSR1 by default (kill -USR1)'''
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            logger.warning(f'No signal to install {self} on this platform')
+            return
+
+        def handler(signum, frame):
+            # Stop writes files, keep signal handler itself short
+            threading.Thread(target=self.toggle, args=(duration,),
+                             daemon=True).start()
+        signal.signal(signum, handler)
+
+    def _sample(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} '
+                                 f'({os.path.basename(code.co_filename)}'
+                                 f':{code.co_firstlineno})')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write_folded(self, stamp: str) -> str:
+        '''Writes samples as "frame;frame;frame count" lines'''
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'cpu-{stamp}.folded')
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+    def write_allocations(self, snapshot: tracemalloc.Snapshot,
+                          stamp: str) -> str:
+        '''Writes top allocation sites by line and by traceback'''
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f'alloc-{stamp}.txt')
+        with open(path, 'w') as f:
+            f.write(f'Top {self.top_allocations} allocation lines\n')
+            for stat in snapshot.statistics('lineno')[:self.top_allocations]:
+                f.write(f'{stat}\n')
+            f.write(f'\nTop {self.top_allocations} allocation tracebacks\n')
+            for stat in snapshot.statistics(
+                    'traceback')[:self.top_allocations]:
+                f.write(f'\n{stat}\n')
+                for line in stat.traceback.format():
+                    f.write(f'{line}\n')
+        return path
+
+
+profiler = Profiler()
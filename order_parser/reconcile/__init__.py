@@ -0,0 +1,199 @@
+'''
+Bulk reconciliation of local SimpleOrders against exchange state.
+
+Positions, open orders (including partial TP/SL and trailing stop
+orders) and, if needed, recent order history of a whole category are
+pulled with a few paginated requests, indexed by orderLinkId and symbol,
+and applied to all local orders in one pass.
+'''
+import logging
+
+from dataclasses import dataclass, field
+from pybit.unified_trading import HTTP
+
+from crypto_math import ED
+from market_utils import OrderCategory
+from simpleorder import SimpleOrder
+from reconcile.exceptions import ErrorReconcile
+
+logger = logging.getLogger(__name__)
+
+TAKE_PROFIT_ORDER_TYPES = ('PartialTakeProfit', 'TakeProfit')
+STOP_LOSS_ORDER_TYPES = ('PartialStopLoss', 'StopLoss')
+
+
+@dataclass
+class ReconcileReport():
+    requests: int = field(default=0)
+    # Local orders updated from exchange state
+    updated: list[SimpleOrder] = field(default_factory=list)
+    # Local orders with an active not yet filled exchange order
+    pending: list[SimpleOrder] = field(default_factory=list)
+    # Local orders with neither position nor active order on exchange
+    missing: list[SimpleOrder] = field(default_factory=list)
+    # Symbols with several local orders sharing one exchange position,
+    # their qty and TP/SL can not be split between orders
+    shared_symbols: set[str] = field(default_factory=set)
+    # Exchange positions and orders unknown locally
+    orphan_positions: list[dict] = field(default_factory=list)
+    orphan_orders: list[dict] = field(default_factory=list)
+
+
+class Reconciler():
+
+    def __init__(self,
+                 session: HTTP,
+                 category: OrderCategory,
+                 settle_coin: str = 'USDT',
+                 history_pages: int = 2) -> None:
+        '''
+        history_pages: max pages of order history requested to find
+            external_id of filled orders
+        '''
+        self.session = session
+        self.category = category
+        self.settle_coin = settle_coin
+        self.history_pages = history_pages
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.category=}, '\
+            f'{self.settle_coin=})'
+
+    def _fetch(self, method: str, limit: int, max_pages: int = None,
+               stop=None, **kwargs) -> tuple[list[dict], int]:
+        '''
+        Requests all pages of session.method.
+        stop(rows) may end pagination early.
+        Returns rows and number of requests.
+        '''
+        rows, requests, cursor = [], 0, ''
+        while True:
+            logger.debug(f'Requesting {method} page {requests} for {self}')
+            res = getattr(self.session, method)(
+                category=self.category.value,
+                settleCoin=self.settle_coin,
+                limit=limit,
+                cursor=cursor,
+                **kwargs)
+            requests += 1
+            if res['retCode'] != 0:
+                logger.error(f'Reconcile {method} {self} API error {res}')
+                raise ErrorReconcile(res)
+            rows.extend(res['result']['list'])
+            cursor = res['result'].get('nextPageCursor', '')
+            if not cursor or (max_pages and requests >= max_pages) or \
+                    (stop and stop(rows)):
+                return rows, requests
+
+    def reconcile(self, orders: list[SimpleOrder]) -> ReconcileReport:
+        '''Updates all local orders from exchange state in one pass'''
+        report = ReconcileReport()
+        try:
+            positions, requests = self._fetch('get_positions', limit=200)
+            report.requests += requests
+            open_orders, requests = self._fetch('get_open_orders', limit=50)
+            report.requests += requests
+
+            local = {so.id: so for so in orders}
+            by_symbol: dict[str, list[SimpleOrder]] = {}
+            for so in orders:
+                by_symbol.setdefault(so.symbol, []).append(so)
+            report.shared_symbols = {symbol for symbol, sos
+                                     in by_symbol.items() if len(sos) > 1}
+
+            active = {}
+            tpsl: dict[str, list[dict]] = {}
+            for order in open_orders:
+                if order.get('stopOrderType') in TAKE_PROFIT_ORDER_TYPES + \
+                        STOP_LOSS_ORDER_TYPES:
+                    tpsl.setdefault(order['symbol'], []).append(order)
+                elif order.get('orderLinkId') in local:
+                    active[order['orderLinkId']] = order
+                else:
+                    report.orphan_orders.append(order)
+
+            open_positions = {p['symbol']: p for p in positions
+                              if ED(p.get('size') or 0) != 0}
+            report.orphan_positions = [p for symbol, p in
+                                       open_positions.items()
+                                       if symbol not in by_symbol]
+
+            unknown_ids = [so for so in orders if not so.external_id and
+                           so.id not in active]
+            if unknown_ids:
+                self._find_external_ids(unknown_ids, report)
+
+            for so in orders:
+                self._apply(so, active.get(so.id),
+                            open_positions.get(so.symbol),
+                            tpsl.get(so.symbol, []), report)
+        except ErrorReconcile:
+            raise
+        except Exception as e:
+            logger.exception(f'Reconcile {self} exception {e}')
+            raise ErrorReconcile
+
+        logger.info(f'Reconciled {len(orders)} orders with '
+                    f'{report.requests} requests: {len(report.updated)=} '
+                    f'{len(report.pending)=} {len(report.missing)=} '
+                    f'{report.shared_symbols=} '
+                    f'{len(report.orphan_positions)=} '
+                    f'{len(report.orphan_orders)=}')
+        return report
+
+    def _find_external_ids(self, orders: list[SimpleOrder],
+                           report: ReconcileReport) -> None:
+        '''Sets external_id of filled orders from recent order history'''
+        wanted = {so.id: so for so in orders}
+
+        def found_all(rows: list[dict]) -> bool:
+            return wanted.keys() <= {row.get('orderLinkId') for row in rows}
+
+        history, requests = self._fetch('get_order_history', limit=50,
+                                        max_pages=self.history_pages,
+                                        stop=found_all)
+        report.requests += requests
+        for row in history:
+            so = wanted.get(row.get('orderLinkId'))
+            if so is not None and not so.external_id:
+                so.external_id = row['orderId']
+
+    def _apply(self, so: SimpleOrder, active: dict, position: dict,
+               tpsl: list[dict], report: ReconcileReport) -> None:
+        if active is not None:
+            so.external_id = active['orderId']
+            so.current.qty = ED(active.get('cumExecQty') or 0)
+            report.pending.append(so)
+
+        if position is None or position.get('side') != so.side.value:
+            if active is None:
+                # Re-placed order has to resend its whole ladder
+                so.forget_synced_state()
+                report.missing.append(so)
+            return
+
+        if position.get('markPrice'):
+            so.current.price = ED(position['markPrice'])
+        if so.symbol in report.shared_symbols:
+            # Qty and TP/SL of the position can not be split between
+            # orders, their local state is kept as is
+            so.update()
+            report.updated.append(so)
+            return
+        so.current.qty = ED(position['size'])
+
+        # Partial TP/SL surviving on exchange become acknowledged state,
+        # full ones are set by place_order() and are not synced
+        so.synced_take_profits = {
+            (ED(o['triggerPrice']), ED(o['qty'])) for o in tpsl
+            if o['stopOrderType'] == 'PartialTakeProfit'}
+        so.synced_stop_losses = {
+            (ED(o['triggerPrice']), ED(o['qty'])) for o in tpsl
+            if o['stopOrderType'] == 'PartialStopLoss'}
+        trailing_stop = ED(position.get('trailingStop') or 0)
+        so.synced_trailing_stop = \
+            (trailing_stop, ED(position.get('activePrice') or 0)) \
+            if trailing_stop != 0 else None
+
+        so.update()
+        report.updated.append(so)
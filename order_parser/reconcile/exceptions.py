@@ -0,0 +1,2 @@
+class ErrorReconcile(Exception):
+    pass
@@ -1,4 +1,5 @@
 import copy
+import math
 import uuid
 import logging
 from pybit.unified_trading import HTTP
@@ -9,8 +10,11 @@ from crypto_math import ED
 from market_utils.order_details import OrderCategory, OrderSide, OrderType
 from market_utils.instrument import InstrumentInfo
 from simpleorder.exceptions import ErrorUpdateCurrentPrice, ErrorPlaceOrder, \
-                        ErrorSetTradingStop, ErrorGetInstrumentInfo
-from market_utils import MarketPosition
+                        ErrorSetTradingStop, ErrorGetInstrumentInfo, \
+                        ErrorSlippageBudget
+from market_utils import MarketPosition, PositionLadder
+from tickers import TickerSnapshot
+from orderbook import OrderBook, SlippageEstimate
 
 logger = logging.getLogger(__name__)
 
@@ -46,25 +50,28 @@ class SimpleOrder():
     take_profits: list[MarketPosition] = field(
         default_factory=list)  # Order take profits list
 
+    adviser: str = field(default='')  # Adviser of the order's prediction
+
     # Trailing stop
     trailing_stop: TrailingStop = field(init=False)
 
-    # List of losses relative to open MarketPosition
-    open_losses: dict[MarketPosition, MarketPosition] = field(
-        init=False, default_factory=dict)
-    # List of losses relative to current MarketPosition
-    current_losses: dict[MarketPosition, MarketPosition] = field(
-        init=False, default_factory=dict)
-
-    # List of profits relative to open MarketPosition
-    open_profits: dict[MarketPosition, MarketPosition] = field(
-        init=False, default_factory=dict)
-    # List of profits relative to current MarketPosition
-    current_profits: dict[MarketPosition, MarketPosition] = field(
-        init=False, default_factory=dict)
+    # Ladder of losses relative to open and current MarketPosition
+    losses: PositionLadder = field(init=False, default_factory=PositionLadder)
+    # Ladder of profits relative to open and current MarketPosition
+    profits: PositionLadder = field(init=False,
+                                    default_factory=PositionLadder)
 
     risk_rate: ED = field(init=False, default=0)  # Risk rate against open
 
+    # Last TP/SL levels (price, qty) and trailing stop
+    # (distance, activation price) acknowledged by exchange
+    synced_take_profits: set[tuple[ED, ED]] = field(
+        init=False, default_factory=set, repr=False)
+    synced_stop_losses: set[tuple[ED, ED]] = field(
+        init=False, default_factory=set, repr=False)
+    synced_trailing_stop: tuple[ED, ED] = field(
+        init=False, default=None, repr=False)
+
     def __post_init__(self) -> None:
         self.id = self.generate_id()
         self.current = copy.copy(self.open)
@@ -84,66 +91,43 @@ class SimpleOrder():
         # Sort stop_losses from worse to best based on order side
         self.stop_losses = sorted(self.stop_losses,
                                   reverse=self.side == OrderSide.BUY)
-
-        self.open_losses.clear()
-        self.current_losses.clear()
-        for stop_loss in self.stop_losses:
-            if self.side == OrderSide.BUY:
-                self.open_losses[stop_loss] = self.open - stop_loss
-                self.open_losses[stop_loss].roi = \
-                    self.open_losses[stop_loss].value / \
-                    self.open.value if self.open.value != 0 else 0
-
-                self.current_losses[stop_loss] = self.current - stop_loss
-                self.current_losses[stop_loss].roi = \
-                    self.current_losses[stop_loss].value / \
-                    self.open.value if self.open.value != 0 else 0
-            else:
-                self.open_losses[stop_loss] = stop_loss - self.open
-                self.open_losses[stop_loss].roi = \
-                    self.open_losses[stop_loss].value / \
-                    self.open.value if self.open.value != 0 else 0
-
-                self.current_losses[stop_loss] = stop_loss - self.current
-                self.current_losses[stop_loss].roi = \
-                    self.current_losses[stop_loss].value / \
-                    self.open.value if self.open.value != 0 else 0
+        self.losses.update(levels=self.stop_losses,
+                           open=self.open,
+                           current=self.current,
+                           direction=1 if self.side == OrderSide.BUY else -1)
 
         # Sort take_profits from worse to best based on order side
         self.take_profits = sorted(self.take_profits,
                                    reverse=self.side == OrderSide.SELL)
-        self.open_profits.clear()
-        self.current_profits.clear()
-        for take_profit in self.take_profits:
-            if self.side == OrderSide.BUY:
-                self.open_profits[take_profit] = take_profit - self.open
-                self.open_profits[take_profit].roi = \
-                    self.open_profits[take_profit].value / \
-                    self.open.value if self.open.value != 0 else 0
-
-                self.current_profits[take_profit] = take_profit - self.current
-                self.current_profits[take_profit].roi = \
-                    self.current_profits[take_profit].value / \
-                    self.open.value if self.open.value != 0 else 0
-            else:
-                self.open_profits[take_profit] = self.open - take_profit
-                self.open_profits[take_profit].roi = \
-                    self.open_profits[take_profit].value / \
-                    self.open.value if self.open.value != 0 else 0
-
-                self.current_profits[take_profit] = self.current - take_profit
-                self.current_profits[take_profit].roi = \
-                    self.current_profits[take_profit].value / \
-                    self.open.value if self.open.value != 0 else 0
-
-        max_profit = max(
-            [profit.value for profit in self.open_profits.values()]) \
-            if self.open_profits else 0
-        max_loss = max(
-            [loss.value for loss in self.open_losses.values()]) \
-            if self.open_losses else 0
+        self.profits.update(levels=self.take_profits,
+                            open=self.open,
+                            current=self.current,
+                            direction=-1 if self.side == OrderSide.BUY else 1)
+
+        max_profit = self.profits.max_open_value()
+        max_loss = self.losses.max_open_value()
         self.risk_rate = max_profit / max_loss if max_loss != 0 else 0
 
+    @property
+    def open_losses(self) -> dict[MarketPosition, MarketPosition]:
+        '''Losses relative to open MarketPosition'''
+        return self.losses.open_dict()
+
+    @property
+    def current_losses(self) -> dict[MarketPosition, MarketPosition]:
+        '''Losses relative to current MarketPosition'''
+        return self.losses.current_dict()
+
+    @property
+    def open_profits(self) -> dict[MarketPosition, MarketPosition]:
+        '''Profits relative to open MarketPosition'''
+        return self.profits.open_dict()
+
+    @property
+    def current_profits(self) -> dict[MarketPosition, MarketPosition]:
+        '''Profits relative to current MarketPosition'''
+        return self.profits.current_dict()
+
     def api_update_instrument_info(self, session: HTTP) -> None:
         ''' Get instrument info about symbol from exchange'''
         try:
@@ -217,31 +201,98 @@ class SimpleOrder():
         self.update()
         return self.current.price
 
-    def api_place_order(self, session: HTTP) -> None:
+    def update_current_price(self, snapshot: TickerSnapshot) -> ED:
+        '''
+        Updates current price from shared category tickers snapshot,
+        which requests exchange at most once per its max_age
+        '''
+        try:
+            self.current.price = snapshot.get_mark_price(self.symbol)
+        except Exception as e:
+            logger.exception(
+                f"Update current price from snapshot for order {self} "
+                f"exception {e}")
+            raise ErrorUpdateCurrentPrice
+
+        self.update()
+        logger.debug(
+            f'Current price for order {self.id=} '
+            f'{self.symbol=} updated from snapshot to {self.current.price}')
+        return self.current.price
+
+    def apply_slippage_budget(self, book: OrderBook,
+                              max_slippage: float) -> SlippageEstimate:
+        '''
+        Estimates market fill of open qty against order book.
+        If expected slippage exceeds max_slippage, MARKET order is switched
+        to LIMIT with the worst acceptable price as open price.
+        Raises ErrorSlippageBudget if the book side to take is empty,
+        as there is no price to limit the order by.
+        '''
+        estimate = book.estimate(self.side, self.open.qty)
+        logger.debug(f'Slippage estimate for order {self.id=} '
+                     f'{self.symbol=} {estimate}')
+        if math.isnan(estimate.best_price):
+            logger.error(f'No {self.side.value} liquidity in order book '
+                         f'{book} for order {self}')
+            raise ErrorSlippageBudget(estimate)
+        if self.type != OrderType.MARKET or \
+                (estimate.complete and estimate.slippage <= max_slippage):
+            return estimate
+
+        sign = 1 if self.side == OrderSide.BUY else -1
+        self.type = OrderType.LIMIT
+        self.open.price = ED(estimate.best_price * (1 + sign * max_slippage))
+        if self.instrument_info is not None:
+            self.open.fit_price(self.instrument_info)
+        self.current = copy.copy(self.open)
+        logger.info(f'Order {self.id=} {self.symbol=} switched to limit '
+                    f'{self.open.price=} by {estimate.slippage=} > '
+                    f'{max_slippage=}')
+        return estimate
+
+    def place_order_payload(self, base: dict = None) -> dict:
         '''
-        Places order by open price
+        Returns session.place_order() arguments. base may keep prebuilt
+        constant arguments like category and symbol.
+        '''
+        payload = dict(base) if base else {'category': self.category.value,
+                                           'symbol': self.symbol}
+        payload['side'] = self.side.value
+        payload['orderType'] = self.type.value
+        payload['qty'] = self.open.qty
+        payload['price'] = self.open.price
+        payload['orderLinkId'] = self.id
+        payload['takeProfit'] = \
+            self.take_profits[-1].price if self.take_profits else 0
+        payload['stopLoss'] = \
+            self.stop_losses[-1].price if self.stop_losses else 0
+        return payload
+
+    def api_place_order(self, session: HTTP,
+                        payload_base: dict = None,
+                        snapshot: TickerSnapshot = None) -> None:
+        '''
+        Places order by open price. Current price after placement is
+        requested by session.get_tickers() right after place_order and
+        becomes open price of MARKET order. If snapshot is given, only
+        current price is taken from it, as it may be up to its max_age
+        older than the placement, and open price stays as sent.
         '''
         logger.debug(f'Placing order via session.place_order() {self}')
         try:
-            tp = self.take_profits[-1].price if self.take_profits else 0
-            sl = self.stop_losses[-1].price if self.stop_losses else 0
-            res = session.place_order(
-                category=self.category.value,
-                symbol=self.symbol,
-                side=self.side.value,
-                orderType=self.type.value,
-                qty=self.open.qty,
-                price=self.open.price,
-                orderLinkId=self.id,
-                takeProfit=tp,
-                stopLoss=sl,
-            )
+            payload = self.place_order_payload(payload_base)
+            tp, sl = payload['takeProfit'], payload['stopLoss']
+            res = session.place_order(**payload)
             if res['retCode'] == 0:
                 self.external_id = res['result']['orderId']
                 self.current.qty = self.open.qty
-                self.api_update_current_price(session)
-                if self.type == OrderType.MARKET:
-                    self.open = copy.copy(self.current)
+                if snapshot is not None:
+                    self.update_current_price(snapshot)
+                else:
+                    self.api_update_current_price(session)
+                    if self.type == OrderType.MARKET:
+                        self.open = copy.copy(self.current)
                 logger.info(f'Order {self.id=} successfully placed '
                             f'{self.symbol=} {self.side.value=} '
                             f'{self.type.value=} {self.open.qty=} '
@@ -255,16 +306,109 @@ class SimpleOrder():
             logger.exception(f'Place order exception {e}')
             raise ErrorPlaceOrder
 
-    def set_partial_take_profits(self, session: HTTP) -> None:
+    def forget_synced_state(self) -> None:
+        '''
+        Drops acknowledged exchange TP/SL/trailing state,
+        so the next sync resends everything
+        '''
+        self.synced_take_profits.clear()
+        self.synced_stop_losses.clear()
+        self.synced_trailing_stop = None
+
+    def _new_levels(self, levels: list[MarketPosition],
+                    synced: set[tuple[ED, ED]]) -> list[MarketPosition]:
+        '''Returns levels not acknowledged by exchange yet'''
+        return [level for level in levels
+                if (level.price, level.qty) not in synced]
+
+    def _cancel_stale_levels(self, session: HTTP,
+                             levels: list[MarketPosition],
+                             synced: set[tuple[ED, ED]],
+                             stop_order_type: str,
+                             name: str) -> int:
+        '''
+        Cancels acknowledged partial levels which are not in the order
+        anymore (moved or removed). Exchange keeps no id of them in the
+        order, so they are found among all pages of open orders by
+        trigger price and qty. Levels not found on any page are already
+        triggered or cancelled.
+        Returns number of requests.
+        '''
+        stale = synced - {(level.price, level.qty) for level in levels}
+        if not stale:
+            return 0
+
+        logger.debug(f'Cancelling stale {name} levels {stale} '
+                     f'via session.cancel_order() for order {self}')
+        requests = 0
+        try:
+            # Collect matches from every page before cancelling,
+            # so cancels do not shift pages still to be read
+            found, cursor = [], ''
+            while True:
+                res = session.get_open_orders(category=self.category.value,
+                                              symbol=self.symbol,
+                                              limit=50,
+                                              cursor=cursor)
+                requests += 1
+                if res['retCode'] != 0:
+                    logger.error(f'Get open {name} orders for order {self} '
+                                 f'API error {res}')
+                    raise ErrorSetTradingStop(res)
+                for order in res['result']['list']:
+                    key = (ED(order.get('triggerPrice') or 0),
+                           ED(order.get('qty') or 0))
+                    if order.get('stopOrderType') == stop_order_type and \
+                            key in stale:
+                        found.append((key, order['orderId']))
+                cursor = res['result'].get('nextPageCursor', '')
+                if not cursor:
+                    break
+
+            for key, order_id in found:
+                res = session.cancel_order(category=self.category.value,
+                                           symbol=self.symbol,
+                                           orderId=order_id)
+                requests += 1
+                if res['retCode'] != 0:
+                    logger.error(f'Cancel {name} for order {self} '
+                                 f'API error {res}')
+                    raise ErrorSetTradingStop(res)
+                stale.discard(key)
+                synced.discard(key)
+                logger.info(f'Stale {name} for order {self.id=} '
+                            f'{self.symbol=} cancelled at {key}')
+
+        except Exception as e:
+            logger.exception(f'Cancel stale {name} for order {self} '
+                             f'exception {e}')
+            raise ErrorSetTradingStop
+
+        synced -= stale
+        return requests
+
+    def set_partial_take_profits(self, session: HTTP) -> int:
         '''
         Adds partial TP. Partial means all of them except last=best,
-        which is set inside place_order()
+        which is set inside place_order(). Acknowledged levels which are
+        not in the order anymore are cancelled first, then only levels
+        not acknowledged by exchange yet are sent.
+        Returns number of requests.
         '''
+        sent = 0
         if self.take_profits:
+            sent += self._cancel_stale_levels(session,
+                                              self.take_profits[0:-1],
+                                              self.synced_take_profits,
+                                              'PartialTakeProfit',
+                                              'take profit')
+            take_profits = self._new_levels(self.take_profits[0:-1],
+                                            self.synced_take_profits)
             logger.debug(
-                f'Start setting {len(self.take_profits)} partial take profits '
+                f'Start setting {len(take_profits)} of '
+                f'{len(self.take_profits)} partial take profits '
                 f'via session.set_trading_stop() for order {self}')
-            for num, take_profit in enumerate(self.take_profits[0:-1]):
+            for num, take_profit in enumerate(take_profits):
                 logger.debug(
                     f'Setting partial take profit {num} {take_profit=}')
 
@@ -285,6 +429,9 @@ class SimpleOrder():
                                      f'{self} API error {res}')
                         raise ErrorSetTradingStop(res)
                     else:
+                        sent += 1
+                        self.synced_take_profits.add(
+                            (take_profit.price, take_profit.qty))
                         logger.info(f'Partial take profit for order {self.id=}'
                                     f'{self.symbol=} successfully set at '
                                     f'{take_profit.qty=} {take_profit.price=}')
@@ -293,17 +440,30 @@ class SimpleOrder():
                     logger.exception('Set partial take profit for order '
                                      f'{self} exception {e}')
                     raise ErrorSetTradingStop
+        return sent
 
-    def set_partial_stop_losses(self, session: HTTP) -> None:
+    def set_partial_stop_losses(self, session: HTTP) -> int:
         '''
         Adds partial SL. Partial means all of them except last=best,
-        which is set inside place_order()
+        which is set inside place_order(). Acknowledged levels which are
+        not in the order anymore are cancelled first, then only levels
+        not acknowledged by exchange yet are sent.
+        Returns number of requests.
         '''
+        sent = 0
         if self.stop_losses:
+            sent += self._cancel_stale_levels(session,
+                                              self.stop_losses[0:-1],
+                                              self.synced_stop_losses,
+                                              'PartialStopLoss',
+                                              'stop loss')
+            stop_losses = self._new_levels(self.stop_losses[0:-1],
+                                           self.synced_stop_losses)
             logger.debug(
-                f'Start setting {len(self.stop_losses)} partial stop losses '
+                f'Start setting {len(stop_losses)} of '
+                f'{len(self.stop_losses)} partial stop losses '
                 f'via session.set_trading_stop() for order {self}')
-            for num, stop_loss in enumerate(self.stop_losses[0:-1]):
+            for num, stop_loss in enumerate(stop_losses):
                 logger.debug(
                     f'Setting partial stop loss {num} {stop_loss=}')
 
@@ -324,6 +484,9 @@ class SimpleOrder():
                                      f'API error {res}')
                         raise ErrorSetTradingStop(res)
 
+                    sent += 1
+                    self.synced_stop_losses.add(
+                        (stop_loss.price, stop_loss.qty))
                     logger.info(f'Partial stop loss for order {self.id=}'
                                 f'{self.symbol=} successfully set at '
                                 f'{stop_loss.qty=} {stop_loss.price=}')
@@ -332,27 +495,33 @@ class SimpleOrder():
                     logger.exception('Set partial stop loss for order '
                                      f'{self} exception {e}')
                     raise ErrorSetTradingStop
+        return sent
 
-    def api_set_trading_stop(self, session: HTTP) -> None:
+    def api_set_trading_stop(self, session: HTTP) -> int:
         '''
         Adds partial SL and TP. Partial means all of them except last=best,
         which is set inside place_order()
         '''
         # self.set_partial_stop_losses(session)
-        self.set_partial_take_profits(session)
+        return self.set_partial_take_profits(session)
 
     def api_set_trailing_stop(self,
                               trailing_stop: TrailingStop,
-                              session: HTTP) -> None:
+                              session: HTTP) -> int:
         '''
-        Add trailing stop to position
-        '''
-        '''
-        Adds partial TP. Partial means all of them except last=best,
-        which is set inside place_order()
+        Add trailing stop to position. Request is skipped if exchange
+        has already acknowledged the same distance and activation price.
+        Returns number of set_trading_stop() requests.
         '''
         self.trailing_stop = trailing_stop
         if self.trailing_stop and self.trailing_stop.active:
+            key = (self.trailing_stop.distance.price,
+                   self.trailing_stop.activation_price.price)
+            if key == self.synced_trailing_stop:
+                logger.debug(f'Trailing stop for order {self.id=} '
+                             f'{self.symbol=} is already set at {key}')
+                return 0
+
             logger.debug(
                 f'Start setting trailing stop via '
                 f'session.set_trading_stop() for order {self}')
@@ -370,6 +539,7 @@ class SimpleOrder():
                                  f'API error {res}')
                     raise ErrorSetTradingStop(res)
                 else:
+                    self.synced_trailing_stop = key
                     logger.info(
                         f'Trailing stop for order {self.id=} '
                         f'{self.symbol=} successfully set at'
@@ -379,3 +549,5 @@ class SimpleOrder():
                 logger.exception(f'Set trailing stop for order {self} '
                                  f'exception {e}')
                 raise ErrorSetTradingStop
+            return 1
+        return 0
@@ -12,3 +12,7 @@ class ErrorGetInstrumentInfo(Exception):
 
 class ErrorUpdateCurrentPrice(Exception):
     pass
+
+
+class ErrorSlippageBudget(Exception):
+    pass
@@ -0,0 +1,90 @@
+'''Exchange session and clock mocks shared by tests'''
+import copy
+import json
+
+INSTRUMENT_INFO_MOCK = '''
+    {
+        "symbol": "PEOPLEUSDT",
+        "launchTime": "1640749024000",
+        "deliveryTime": "0",
+        "deliveryFeeRate": "",
+        "priceScale": "5",
+        "leverageFilter": {
+            "minLeverage": "1",
+            "maxLeverage": "12.50",
+            "leverageStep": "0.01"
+        },
+        "priceFilter": {
+            "minPrice": "0.00005",
+            "maxPrice": "99.99990",
+            "tickSize": "0.00005"
+        },
+        "lotSizeFilter": {
+            "maxOrderQty": "460000",
+            "minOrderQty": "1",
+            "qtyStep": "1",
+            "postOnlyMaxOrderQty": "4600000"
+        },
+        "fundingInterval": 480
+    }
+'''
+
+
+class ExchangeSessionMock():
+    '''Serves instruments info pages, tickers and order placement'''
+
+    def __init__(self, symbols: list[str], page_size: int = 2) -> None:
+        info = json.loads(INSTRUMENT_INFO_MOCK)
+        self.instruments = []
+        for symbol in symbols:
+            info = copy.deepcopy(info)
+            info['symbol'] = symbol
+            self.instruments.append(info)
+        self.page_size = page_size
+        self.calls = []
+
+    def get_instruments_info(self, category: str, symbol: str = None,
+                             limit: int = 500, cursor: str = '') -> dict:
+        self.calls.append('get_instruments_info')
+        instruments = [i for i in self.instruments
+                       if symbol is None or i['symbol'] == symbol]
+        start = int(cursor or 0)
+        end = start + self.page_size
+        return {'retCode': 0,
+                'result': {'category': category,
+                           'list': instruments[start:end],
+                           'nextPageCursor': str(end)
+                           if end < len(instruments) else ''}}
+
+    def get_tickers(self, category: str, symbol: str = None) -> dict:
+        self.calls.append('get_tickers')
+        return {'retCode': 0,
+                'result': {'list': [{'symbol': i['symbol'],
+                                     'markPrice': '0.0201'}
+                                    for i in self.instruments
+                                    if symbol in (None, i['symbol'])]}}
+
+    def place_order(self, **kwargs) -> dict:
+        self.calls.append('place_order')
+        self.placed = kwargs
+        return {'retCode': 0, 'result': {'orderId': 'ext-1',
+                                         'orderLinkId': kwargs['orderLinkId']}}
+
+
+class ClockMock():
+
+    def __init__(self, now: float = 0.) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SleepMock():
+    '''Advances ClockMock instead of sleeping'''
+
+    def __init__(self, clock: ClockMock) -> None:
+        self.clock = clock
+
+    def __call__(self, seconds: float) -> None:
+        self.clock.now += seconds
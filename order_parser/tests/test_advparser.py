@@ -0,0 +1,112 @@
+import pickle
+import unittest
+
+from dataclasses import asdict
+
+from crypto_math import ED
+from market_utils import OrderSide
+from advparser import AdviserPrediction, parse_generic
+from advparser.templates import TemplateRegistry, PredictionTemplate, \
+    HASHTAG_TEMPLATE, POINT_TEMPLATE
+
+HASHTAG_ADVISE = """
+    🎈 #LINK/USDT - LONG📈
+
+    🟢 Открытие - 6.342-6.153
+
+    ✅ Цели - 1-6.411 2-6.475  3-6.529 4-6.611
+
+    ♾ - Плечо - х20 (Cross)
+
+    🔴 Стоп - 5.965
+    """
+
+POINT_ADVISE = """
+    SOL | USDT = SHORT
+
+    Точка входа: 19.180
+    Тейк-профит: 18.422 | 17.854
+    Кредитное плечо: 50x
+    Стоп-лосс: 19.609
+    """
+
+GENERIC_ADVISE = """
+    Sell BTCUSDT
+    Open 27000
+    TP 26000 25000
+    SL 28000
+    """
+
+
+class AdviserTemplateTests(unittest.TestCase):
+
+    def test_hashtag_template(self):
+        ap = AdviserPrediction(adviser='A', prediction_text=HASHTAG_ADVISE,
+                               registry=TemplateRegistry([HASHTAG_TEMPLATE]))
+        self.assertEqual(ap.symbol, 'LINKUSDT')
+        self.assertEqual(ap.leverage, ED(20))
+        self.assertEqual(ap.side, OrderSide.BUY)
+        self.assertEqual(ap.opens, [ED('6.153'), ED('6.342')])
+        self.assertEqual(ap.take_profits, list(map(
+            ED, ['6.411', '6.475', '6.529', '6.611'])))
+        self.assertEqual(ap.stop_losses, [ED('5.965')])
+
+    def test_point_template(self):
+        ap = AdviserPrediction(adviser='B', prediction_text=POINT_ADVISE)
+        self.assertEqual(ap.symbol, 'SOLUSDT')
+        self.assertEqual(ap.leverage, ED(50))
+        self.assertEqual(ap.side, OrderSide.SELL)
+        self.assertEqual(ap.opens, [ED('19.180')])
+        self.assertEqual(ap.take_profits, [ED('17.854'), ED('18.422')])
+        self.assertEqual(ap.stop_losses, [ED('19.609')])
+
+    def test_templates_agree_with_generic_parser(self):
+        for advise in (HASHTAG_ADVISE, POINT_ADVISE):
+            text = advise.upper()
+            prediction = TemplateRegistry(
+                [HASHTAG_TEMPLATE, POINT_TEMPLATE]).parse('A', text)
+            generic = parse_generic(text)
+            for key in ('open', 'tp', 'sl'):
+                self.assertEqual(prediction[key], generic[key])
+
+    def test_generic_fallback(self):
+        ap = AdviserPrediction(adviser='C', prediction_text=GENERIC_ADVISE)
+        self.assertEqual(ap.symbol, '')
+        self.assertEqual(ap.leverage, ED(0))
+        self.assertEqual(ap.side, OrderSide.SELL)
+        self.assertEqual(ap.opens, [ED(27000)])
+
+    def test_failed_extraction_falls_back(self):
+        broken = PredictionTemplate(name='broken', markers=('OPEN',),
+                                    symbol=r'#(\w+)', side=r'(LONG)',
+                                    open=r'OPEN (.*)', tp=r'TP (.*)',
+                                    sl=r'SL (.*)')
+        registry = TemplateRegistry([broken])
+        ap = AdviserPrediction(adviser='C', prediction_text=GENERIC_ADVISE,
+                               registry=registry)
+        self.assertEqual(ap.stop_losses, [ED(28000)])
+        self.assertNotIn('C', registry.adviser_templates)
+
+    def test_registry_remembers_adviser_template(self):
+        registry = TemplateRegistry([HASHTAG_TEMPLATE, POINT_TEMPLATE])
+        AdviserPrediction(adviser='B', prediction_text=POINT_ADVISE,
+                          registry=registry)
+        self.assertIs(registry.adviser_templates['B'], POINT_TEMPLATE)
+
+    def test_only_targets_are_enumerated(self):
+        text = HASHTAG_ADVISE.replace('6.342-6.153', '5-6').upper()
+        prediction = TemplateRegistry([HASHTAG_TEMPLATE]).parse('A', text)
+        self.assertEqual(prediction['open'], [ED(5), ED(6)])
+        self.assertEqual(prediction['open'], parse_generic(text)['open'])
+        self.assertEqual(prediction['tp'], list(map(
+            ED, ['6.411', '6.475', '6.529', '6.611'])))
+
+    def test_registry_is_not_kept_in_prediction(self):
+        ap = AdviserPrediction(adviser='B', prediction_text=POINT_ADVISE)
+        self.assertNotIn('registry', vars(ap))
+        self.assertNotIn('registry', asdict(ap))
+        self.assertNotIn(b'TemplateRegistry', pickle.dumps(ap))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import time
+import unittest
+
+from pybit.exceptions import InvalidRequestError
+
+from guardedsession import GuardedSession, DUPLICATE_ORDER_LINK_ID
+from guardedsession.exceptions import ErrorRequestTimeout, \
+    ErrorRequestFailed
+
+
+class SlowSessionMock():
+
+    def __init__(self, name: str, delay: float = 0., fail: bool = False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.orders = {}
+        self.place_calls = 0
+        # Placement reaches exchange but answer is lost this many times
+        self.lose_answers = 0
+        # Placement is lost before reaching exchange this many times
+        self.lose_requests = 0
+        # Seconds placement answers after the order is on exchange
+        self.place_delay = 0.
+
+    def get_tickers(self, **kwargs) -> dict:
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(self.name)
+        return {'retCode': 0, 'result': {'session': self.name}}
+
+    def set_trading_stop(self, **kwargs) -> dict:
+        time.sleep(self.delay)
+        return {'retCode': 0, 'result': {}}
+
+    def place_order(self, **kwargs) -> dict:
+        self.place_calls += 1
+        if self.lose_requests:
+            self.lose_requests -= 1
+            raise ConnectionError('Request lost')
+        link_id = kwargs.get('orderLinkId') or f'auto-{self.place_calls}'
+        if link_id in self.orders:
+            raise InvalidRequestError(request='place_order',
+                                      message='OrderLinkedID is duplicate',
+                                      status_code=DUPLICATE_ORDER_LINK_ID,
+                                      time='', resp_headers={})
+        self.orders[link_id] = f'ext-{link_id}'
+        time.sleep(self.place_delay)
+        if self.lose_answers:
+            self.lose_answers -= 1
+            raise ConnectionError('Answer lost')
+        return {'retCode': 0, 'result': {'orderId': self.orders[link_id],
+                                         'orderLinkId': link_id}}
+
+    def get_open_orders(self, **kwargs) -> dict:
+        link_id = kwargs['orderLinkId']
+        orders = [{'orderId': self.orders[link_id], 'orderLinkId': link_id}] \
+            if link_id in self.orders else []
+        return {'retCode': 0, 'result': {'list': orders}}
+
+    def get_order_history(self, **kwargs) -> dict:
+        return {'retCode': 0, 'result': {'list': []}}
+
+
+class GuardedSessionTests(unittest.TestCase):
+
+    def guard(self, *sessions, **kwargs) -> GuardedSession:
+        guard = GuardedSession(list(sessions), **kwargs)
+        self.addCleanup(guard.close)
+        return guard
+
+    def test_fast_primary_is_not_hedged(self):
+        guard = self.guard(SlowSessionMock('a'), SlowSessionMock('b'))
+        res = guard.get_tickers(category='linear')
+        self.assertEqual(res['result']['session'], 'a')
+        self.assertEqual(guard.metrics['get_tickers'].hedges, 0)
+
+    def test_slow_primary_is_hedged(self):
+        guard = self.guard(SlowSessionMock('a', delay=0.5),
+                           SlowSessionMock('b'),
+                           hedge_after=0.02)
+        res = guard.get_tickers(category='linear')
+        self.assertEqual(res['result']['session'], 'b')
+        metrics = guard.metrics['get_tickers']
+        self.assertEqual((metrics.hedges, metrics.hedges_won), (1, 1))
+
+    def test_failed_primary_fails_over(self):
+        guard = self.guard(SlowSessionMock('a', fail=True),
+                           SlowSessionMock('b'),
+                           hedge_after=10)
+        res = guard.get_tickers(category='linear')
+        self.assertEqual(res['result']['session'], 'b')
+        self.assertEqual(guard.metrics['get_tickers'].failovers, 1)
+
+        guard = self.guard(SlowSessionMock('a', fail=True))
+        with self.assertRaises(ErrorRequestFailed):
+            guard.get_tickers(category='linear')
+
+    def test_budget(self):
+        guard = self.guard(SlowSessionMock('a', delay=0.3),
+                           budgets={'get_tickers': 0.05,
+                                    'set_trading_stop': 0.05},
+                           hedge_after=0.02)
+        with self.assertRaises(ErrorRequestTimeout):
+            guard.get_tickers(category='linear')
+        with self.assertRaises(ErrorRequestTimeout):
+            guard.set_trading_stop(category='linear')
+        self.assertEqual(guard.metrics['set_trading_stop'].timeouts, 1)
+
+    def test_lost_placement_is_recovered_not_resent(self):
+        session = SlowSessionMock('a')
+        session.lose_answers = 1
+        guard = self.guard(session)
+        res = guard.place_order(category='linear', symbol='BTCUSDT',
+                                orderLinkId='id-1')
+        self.assertEqual(res['result']['orderId'], 'ext-id-1')
+        self.assertEqual(session.place_calls, 1)
+        self.assertEqual(guard.metrics['place_order'].recovered, 1)
+
+    def test_lost_request_is_resent(self):
+        session = SlowSessionMock('a')
+        session.lose_requests = 1
+        guard = self.guard(session)
+        res = guard.place_order(category='linear', symbol='BTCUSDT',
+                                orderLinkId='id-3')
+        self.assertEqual(res['result']['orderId'], 'ext-id-3')
+        self.assertEqual(session.place_calls, 2)
+        self.assertEqual(guard.metrics['place_order'].retries, 1)
+
+    def test_slow_placement_is_looked_up_within_budget(self):
+        session = SlowSessionMock('a')
+        session.place_delay = 0.3
+        guard = self.guard(session, budgets={'place_order': 0.4})
+        start = time.monotonic()
+        res = guard.place_order(category='linear', symbol='BTCUSDT',
+                                orderLinkId='id-4')
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertEqual(res['result']['orderId'], 'ext-id-4')
+        self.assertEqual(session.place_calls, 1)
+        metrics = guard.metrics['place_order']
+        self.assertEqual((metrics.timeouts, metrics.recovered), (1, 1))
+
+    def test_placement_without_link_id_waits_whole_budget(self):
+        session = SlowSessionMock('a')
+        session.place_delay = 0.3
+        guard = self.guard(session, budgets={'place_order': 0.8})
+        res = guard.place_order(category='linear', symbol='BTCUSDT')
+        self.assertEqual(res['result']['orderId'], 'ext-auto-1')
+        self.assertEqual(session.place_calls, 1)
+        self.assertEqual(guard.metrics['place_order'].timeouts, 0)
+
+    def test_duplicate_placement_returns_existing_order(self):
+        session = SlowSessionMock('a')
+        session.orders['id-2'] = 'ext-existing'
+        guard = self.guard(session)
+        res = guard.place_order(category='linear', symbol='BTCUSDT',
+                                orderLinkId='id-2')
+        self.assertEqual(res['result']['orderId'], 'ext-existing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import math
+import random
+import unittest
+
+import numpy as np
+
+from crypto_math import ED
+from market_utils import MarketPosition
+from indicators import Candles, SMA, EMA, ATR, Volatility, VWAP, \
+    trailing_stop_by_atr
+
+
+def make_kline(n: int) -> dict:
+    '''session.get_kline() like response, newest candle first'''
+    rnd = random.Random(7)
+    rows, close = [], 100.
+    for num in range(n):
+        open = close
+        close = open * math.exp(rnd.gauss(0, 0.01))
+        high = max(open, close) * (1 + rnd.random() * 0.005)
+        low = min(open, close) * (1 - rnd.random() * 0.005)
+        volume = rnd.uniform(1, 100)
+        rows.append([str(1697000000000 + num * 60000), str(open), str(high),
+                     str(low), str(close), str(volume), str(volume * close)])
+    return {'retCode': 0, 'result': {'symbol': 'BTCUSDT', 'category':
+                                     'linear', 'list': rows[::-1]}}
+
+
+class IndicatorsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.candles = Candles.from_kline(make_kline(600))
+        self.history = Candles(**{name: getattr(self.candles, name)[:500]
+                                  for name in ('start', 'open', 'high', 'low',
+                                               'close', 'volume',
+                                               'turnover')})
+
+    def indicators(self) -> list:
+        return [SMA(20), EMA(20), ATR(14), Volatility(20), VWAP(),
+                VWAP(30)]
+
+    def test_kline_order(self):
+        self.assertTrue((np.diff(self.candles.start) > 0).all())
+
+    def test_backfill_matches_streaming(self):
+        for streamed, backfilled in zip(self.indicators(), self.indicators()):
+            expected = [streamed.update(candle) for candle in self.candles]
+            series = backfilled.backfill(self.candles)
+            np.testing.assert_allclose(series, expected, rtol=1e-9,
+                                       err_msg=type(streamed).__name__)
+            self.assertAlmostEqual(backfilled.value, streamed.value)
+
+    def test_update_after_backfill(self):
+        for streamed, continued in zip(self.indicators(), self.indicators()):
+            for candle in self.candles:
+                streamed.update(candle)
+            continued.backfill(self.history)
+            for candle in list(self.candles)[500:]:
+                continued.update(candle)
+            self.assertAlmostEqual(continued.value, streamed.value,
+                                   msg=type(streamed).__name__)
+
+    def test_not_enough_candles(self):
+        sma = SMA(20)
+        self.assertTrue(np.isnan(sma.backfill(self.history)[:19]).all())
+        self.assertTrue(math.isnan(ATR(14).update(next(iter(self.history)))))
+
+    def test_trailing_stop_by_atr(self):
+        atr = ATR(14)
+        atr.backfill(self.history)
+        ts = trailing_stop_by_atr(atr.value, MarketPosition(0, 101), 3)
+        self.assertTrue(ts.active)
+        self.assertEqual(ts.distance.price, ED(atr.value * 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
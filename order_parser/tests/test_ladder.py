@@ -0,0 +1,90 @@
+import unittest
+
+from crypto_math import ED
+from market_utils import MarketPosition, OrderSide, OrderCategory, \
+    OrderType, PositionLadder
+from simpleorder import SimpleOrder
+
+
+class PositionLadderTests(unittest.TestCase):
+
+    def setUp(self):
+        self.open = MarketPosition(3, 10)
+        self.current = MarketPosition(3, 12)
+        self.levels = [MarketPosition(1, 8), MarketPosition(2, 9)]
+
+    def test_deltas_match_market_position_arithmetic(self):
+        ladder = PositionLadder()
+        ladder.update(levels=self.levels, open=self.open,
+                      current=self.current, direction=1)
+
+        open_dict = ladder.open_dict()
+        current_dict = ladder.current_dict()
+        for level in self.levels:
+            expected = self.open - level
+            self.assertEqual(open_dict[level].qty, expected.qty)
+            self.assertAlmostEqual(float(open_dict[level].value),
+                                   float(expected.value))
+            self.assertAlmostEqual(float(open_dict[level].roi),
+                                   float(expected.value / self.open.value))
+
+            expected = self.current - level
+            self.assertAlmostEqual(float(current_dict[level].value),
+                                   float(expected.value))
+
+    def test_reverse_direction(self):
+        ladder = PositionLadder(direction=-1)
+        ladder.update(levels=self.levels, open=self.open,
+                      current=self.current)
+        self.assertEqual(list(ladder.open_values), [-22.0, -12.0])
+
+    def test_empty_ladder(self):
+        ladder = PositionLadder()
+        ladder.update(levels=[], open=self.open, current=self.current)
+        self.assertEqual(len(ladder), 0)
+        self.assertEqual(ladder.max_open_value(), ED(0))
+        self.assertEqual(ladder.open_dict(), {})
+
+
+class SimpleOrderLadderTests(unittest.TestCase):
+
+    def test_sell_order_views_and_risk_rate(self):
+        so = SimpleOrder(category=OrderCategory.LINEAR,
+                         type=OrderType.MARKET,
+                         symbol='PEOPLEUSDT',
+                         side=OrderSide.SELL,
+                         open=MarketPosition(2, 10),
+                         stop_losses=[MarketPosition(2, 11)],
+                         take_profits=[MarketPosition(1, 8),
+                                       MarketPosition(2, 7)])
+        so.update()
+
+        loss = so.open_losses[so.stop_losses[0]]
+        self.assertEqual(loss.value, ED(2))
+        self.assertEqual(loss.roi, ED('0.1'))
+
+        profits = [p.value for p in so.open_profits.values()]
+        self.assertEqual(profits, [ED(12), ED(6)])
+        self.assertEqual(so.risk_rate, ED(6))
+
+    def test_views_and_risk_rate_are_exact(self):
+        so = SimpleOrder(category=OrderCategory.LINEAR,
+                         type=OrderType.MARKET,
+                         symbol='PEOPLEUSDT',
+                         side=OrderSide.BUY,
+                         open=MarketPosition(3, '0.02'),
+                         stop_losses=[MarketPosition(1, '0.002')],
+                         take_profits=[MarketPosition(3, '0.03'),
+                                       MarketPosition(1, '0.04')])
+        so.update()
+
+        loss = so.open_losses[so.stop_losses[0]]
+        self.assertEqual(str(loss.price), '0.029')
+        self.assertEqual(loss.value, ED('0.058'))
+        self.assertEqual([str(p.qty) for p in so.open_profits.values()],
+                         ['0', '-2'])
+        self.assertEqual(so.risk_rate, ED('0.03') / ED('0.058'))
+
+
+if __name__ == '__main__':
+    unittest.main()
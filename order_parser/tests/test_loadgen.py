@@ -0,0 +1,103 @@
+import unittest
+
+from crypto_math import ED
+from market_utils import OrderSide
+from advparser import AdviserPrediction
+from loadgen import SignalGenerator, SignalPipeline, SoakTest, \
+    FakeExchange, size_prediction
+from loadgen.exceptions import ErrorSignalMismatch
+from tests.mocks import ClockMock, SleepMock
+
+
+class SignalGeneratorTests(unittest.TestCase):
+
+    def test_every_format_parses_to_generated_values(self):
+        for layout in ('hashtag', 'point', 'generic'):
+            generator = SignalGenerator(formats=(layout,), seed=7)
+            for _ in range(200):
+                signal = generator.next()
+                ap = AdviserPrediction(adviser=signal.adviser,
+                                       prediction_text=signal.text)
+                self.assertEqual(ap.side, signal.side, signal.text)
+                self.assertEqual(ap.opens, signal.opens, signal.text)
+                self.assertEqual(ap.take_profits, signal.take_profits,
+                                 signal.text)
+                self.assertEqual(ap.stop_losses, signal.stop_losses,
+                                 signal.text)
+                if layout != 'generic':
+                    self.assertEqual(ap.symbol, signal.symbol)
+
+    def test_seed_repeats_messages(self):
+        a, b = SignalGenerator(seed=3), SignalGenerator(seed=3)
+        self.assertEqual([a.next().text for _ in range(10)],
+                         [b.next().text for _ in range(10)])
+
+
+class SignalPipelineTests(unittest.TestCase):
+
+    def setUp(self):
+        self.generator = SignalGenerator(seed=1)
+        self.exchange = FakeExchange(seed=1)
+        self.pipeline = SignalPipeline(self.exchange, live_orders=10)
+
+    def test_size_prediction(self):
+        signal = self.generator.next()
+        ap = self.pipeline.parse(signal)
+        sized = size_prediction(ap, ED(10))
+        open = sized['open']
+        farthest = sized['stop_losses'][-1]
+        self.assertAlmostEqual(
+            float(abs(open.price - farthest.price) * open.qty), 10)
+        self.assertEqual(sum(tp.qty for tp in sized['take_profits']),
+                         open.qty)
+        distances = [abs(tp.price - open.price)
+                     for tp in sized['take_profits']]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_process(self):
+        for _ in range(30):
+            so = self.pipeline.process(self.generator.next())
+            self.assertTrue(so.external_id)
+            self.assertIsNotNone(so.instrument_info)
+        self.assertEqual(len(self.pipeline.live), 10)
+        self.assertEqual(self.exchange.calls['place_order'], 30)
+
+    def test_mismatch(self):
+        signal = self.generator.next()
+        signal = signal._replace(side=OrderSide.BUY
+                                 if signal.side == OrderSide.SELL
+                                 else OrderSide.SELL)
+        with self.assertRaises(ErrorSignalMismatch):
+            self.pipeline.process(signal)
+
+
+class SoakTestTests(unittest.TestCase):
+
+    def test_rate_and_samples(self):
+        clock = ClockMock()
+        pipeline = SignalPipeline(FakeExchange(seed=2))
+        soak = SoakTest(SignalGenerator(seed=2), pipeline,
+                        rate=50, report_interval=1,
+                        count_objects=False,
+                        clock=clock, sleep=SleepMock(clock))
+        samples = []
+        report = soak.run(messages=200, on_sample=samples.append)
+
+        self.assertEqual(report.messages, 200)
+        self.assertEqual(report.samples, samples)
+        self.assertEqual(sum(s.messages for s in samples), 200)
+        self.assertEqual(len(samples), 4)
+        self.assertAlmostEqual(report.throughput, 50, delta=1)
+        self.assertFalse(report.errors)
+
+    def test_errors_are_counted(self):
+        pipeline = SignalPipeline(FakeExchange(reject_rate=1, seed=3))
+        soak = SoakTest(SignalGenerator(seed=3), pipeline, rate=0,
+                        count_objects=False)
+        report = soak.run(messages=5)
+        self.assertEqual(report.errors, {'ErrorPlaceOrder': 5})
+        self.assertEqual(report.samples[-1].errors, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import copy
+import unittest
+
+from crypto_math import ED
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from orderbook import OrderBook
+from simpleorder import SimpleOrder
+from simpleorder.exceptions import ErrorSlippageBudget
+
+# Recorded session.get_orderbook() response, trimmed to 4 levels
+ORDER_BOOK_RESPONSE = {
+    'retCode': 0,
+    'retMsg': 'OK',
+    'result': {
+        's': 'BTCUSDT',
+        'b': [['27000.0', '1.5'], ['26999.5', '2'],
+              ['26998.0', '4'], ['26990.0', '10']],
+        'a': [['27000.5', '1'], ['27001.0', '2'],
+              ['27003.0', '3'], ['27010.0', '10']],
+        'ts': 1697000000000,
+        'u': 100,
+    },
+}
+
+
+class OrderBookTests(unittest.TestCase):
+
+    def setUp(self):
+        self.book = OrderBook.from_response(ORDER_BOOK_RESPONSE)
+
+    def test_fill_inside_best_level(self):
+        estimate = self.book.estimate(OrderSide.BUY, 0.5)
+        self.assertEqual(estimate.avg_price, 27000.5)
+        self.assertEqual(estimate.slippage, 0)
+        self.assertTrue(estimate.complete)
+
+    def test_fill_across_levels(self):
+        estimate = self.book.estimate(OrderSide.BUY, 4)
+        self.assertAlmostEqual(estimate.avg_price,
+                               (27000.5 + 2 * 27001 + 27003) / 4)
+        self.assertEqual(estimate.worst_price, 27003)
+
+        estimate = self.book.estimate(OrderSide.SELL, 3.5)
+        self.assertAlmostEqual(estimate.avg_price,
+                               (1.5 * 27000 + 2 * 26999.5) / 3.5)
+        self.assertGreater(estimate.slippage, 0)
+
+    def test_not_enough_depth(self):
+        estimate = self.book.estimate(OrderSide.BUY, 100)
+        self.assertEqual(estimate.filled_qty, 16)
+        self.assertFalse(estimate.complete)
+
+    def test_max_qty(self):
+        for side in OrderSide:
+            qty = self.book.max_qty(side, 0.00005)
+            self.assertAlmostEqual(self.book.estimate(side, qty).slippage,
+                                   0.00005)
+        self.assertEqual(self.book.max_qty(OrderSide.BUY, 1), 16)
+
+    def test_stream_delta(self):
+        self.book.on_message({'type': 'delta', 'ts': 1,
+                              'data': {'s': 'BTCUSDT', 'u': 101,
+                                       'b': [], 'a': [['27000.5', '0'],
+                                                      ['27000.8', '5']]}})
+        self.assertEqual(self.book.update_id, 101)
+        self.assertEqual(self.book.estimate(OrderSide.BUY, 1).avg_price,
+                         27000.8)
+
+    def test_order_switches_to_limit(self):
+        so = SimpleOrder(category=OrderCategory.LINEAR,
+                         type=OrderType.MARKET,
+                         symbol='BTCUSDT',
+                         side=OrderSide.BUY,
+                         open=MarketPosition(10, 27000))
+        so.apply_slippage_budget(self.book, 0.001)
+        self.assertEqual(so.type, OrderType.MARKET)
+
+        so.apply_slippage_budget(self.book, 0.0001)
+        self.assertEqual(so.type, OrderType.LIMIT)
+        self.assertEqual(so.open.price.quantize(ED('0.01')),
+                         ED('27003.20'))
+
+    def test_empty_book_side_keeps_order(self):
+        response = copy.deepcopy(ORDER_BOOK_RESPONSE)
+        response['result']['a'] = []
+        book = OrderBook.from_response(response)
+        so = SimpleOrder(category=OrderCategory.LINEAR,
+                         type=OrderType.MARKET,
+                         symbol='BTCUSDT',
+                         side=OrderSide.BUY,
+                         open=MarketPosition(10, 27000))
+        with self.assertRaises(ErrorSlippageBudget):
+            so.apply_slippage_budget(book, 0.001)
+        self.assertEqual(so.type, OrderType.MARKET)
+        self.assertEqual(so.open.price, ED(27000))
+
+
+if __name__ == '__main__':
+    unittest.main()
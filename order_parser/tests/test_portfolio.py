@@ -0,0 +1,85 @@
+import unittest
+
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder
+from portfolio import Portfolio
+
+
+class PortfolioTests(unittest.TestCase):
+
+    def setUp(self):
+        self.orders = [
+            SimpleOrder(category=OrderCategory.LINEAR,
+                        type=OrderType.MARKET,
+                        symbol='BTCUSDT',
+                        side=OrderSide.BUY,
+                        open=MarketPosition(2, 100),
+                        stop_losses=[MarketPosition(1, 90),
+                                     MarketPosition(2, 80)],
+                        take_profits=[MarketPosition(2, 120)],
+                        adviser='A'),
+            SimpleOrder(category=OrderCategory.LINEAR,
+                        type=OrderType.MARKET,
+                        symbol='BTCUSDT',
+                        side=OrderSide.SELL,
+                        open=MarketPosition(1, 110),
+                        stop_losses=[MarketPosition(1, 120)],
+                        take_profits=[MarketPosition(1, 100),
+                                      MarketPosition(1, 90)],
+                        adviser='B'),
+            SimpleOrder(category=OrderCategory.LINEAR,
+                        type=OrderType.MARKET,
+                        symbol='SOLUSDT',
+                        side=OrderSide.BUY,
+                        open=MarketPosition(10, 20),
+                        adviser='A'),
+        ]
+        self.portfolio = Portfolio(self.orders)
+
+    def test_matches_simple_order_update(self):
+        for num, so in enumerate(self.orders):
+            self.assertAlmostEqual(self.portfolio.worst_loss[num],
+                                   float(so.losses.max_open_value()))
+            self.assertAlmostEqual(self.portfolio.best_profit[num],
+                                   float(so.profits.max_open_value()))
+
+    def test_totals(self):
+        totals = self.portfolio.totals()
+        self.assertEqual(totals.orders, 3)
+        self.assertEqual(totals.open_value, 200 + 110 + 200)
+        self.assertEqual(totals.net_exposure, 200 - 110 + 200)
+        # Losses follow MarketPosition subtraction: open.value - sl.value
+        self.assertEqual(totals.worst_loss, 110 + 10)
+        self.assertEqual(totals.best_profit, 40 + 20)
+        self.assertEqual(totals.pnl, 0)
+
+    def test_price_tick(self):
+        self.portfolio.update_prices({'BTCUSDT': 105})
+        self.portfolio.calculate()
+
+        by_symbol = self.portfolio.by_symbol()
+        self.assertEqual(by_symbol['BTCUSDT'].pnl, 10 + 5)
+        self.assertEqual(by_symbol['BTCUSDT'].current_worst_loss,
+                         (210 - 90) + (120 - 105))
+        self.assertEqual(by_symbol['SOLUSDT'].exposure, 200)
+
+        for num, so in enumerate(self.orders):
+            so.current.price = self.portfolio.current_price[num]
+            so.update()
+            self.assertAlmostEqual(
+                self.portfolio.current_worst_loss[num],
+                max(so.losses.current_values, default=0))
+
+    def test_groups(self):
+        self.assertEqual(self.portfolio.by_side()['Sell'].orders, 1)
+        self.assertEqual(self.portfolio.by_adviser()['A'].orders, 2)
+        self.assertEqual(self.portfolio.by_adviser()['B'].worst_loss, 10)
+
+    def test_empty(self):
+        portfolio = Portfolio()
+        self.assertEqual(portfolio.totals().orders, 0)
+        self.assertEqual(portfolio.by_symbol(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
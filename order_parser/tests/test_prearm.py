@@ -0,0 +1,78 @@
+import unittest
+
+from crypto_math import ED
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from prearm import OrderArmory
+from tickers import TickerSnapshot
+from tests.mocks import ExchangeSessionMock, ClockMock
+
+
+class OrderArmoryTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = ExchangeSessionMock(
+            ['AUSDT', 'BUSDT', 'PEOPLEUSDT', 'CUSDT', 'DUSDT'])
+        self.clock = ClockMock()
+        self.armory = OrderArmory(category=OrderCategory.LINEAR,
+                                  watchlist=['PEOPLEUSDT', 'CUSDT', 'XUSDT'],
+                                  max_age=60,
+                                  clock=self.clock)
+        self.armory.api_arm(self.session)
+
+    def test_bulk_arm(self):
+        self.assertEqual(set(self.armory.armed), {'PEOPLEUSDT', 'CUSDT'})
+        self.assertEqual(self.session.calls, ['get_instruments_info'] * 3)
+
+    def test_signal_path_is_one_request(self):
+        self.armory.snapshot = TickerSnapshot(self.session,
+                                              OrderCategory.LINEAR,
+                                              clock=self.clock)
+        self.armory.snapshot.refresh()
+        self.session.calls.clear()
+        so = self.armory.build_order(
+            symbol='PEOPLEUSDT',
+            side=OrderSide.BUY,
+            open=MarketPosition('3.4', '0.020012'),
+            stop_losses=[MarketPosition(1, '0.0150001')],
+            take_profits=[MarketPosition(1, '0.03'),
+                          MarketPosition(2, '0.040003')])
+        self.assertEqual(so.open.qty, ED(3))
+        self.assertEqual(so.open.price, ED('0.02'))
+        self.assertEqual(so.take_profits[-1].price, ED('0.04'))
+        self.assertIsNotNone(so.instrument_info)
+
+        self.armory.place(self.session, so)
+        self.assertEqual(self.session.calls, ['place_order'])
+        self.assertEqual(so.current.price, ED('0.0201'))
+        # Snapshot price may predate placement, open stays as sent
+        self.assertEqual(so.open.price, ED('0.02'))
+        self.assertEqual(self.session.placed['symbol'], 'PEOPLEUSDT')
+        self.assertEqual(self.session.placed['orderLinkId'], so.id)
+        self.assertEqual(so.external_id, 'ext-1')
+
+    def test_without_snapshot_price_is_requested(self):
+        self.session.calls.clear()
+        so = self.armory.build_order(symbol='PEOPLEUSDT',
+                                     side=OrderSide.BUY,
+                                     open=MarketPosition(3, '0.02'))
+        self.armory.place(self.session, so)
+        self.assertEqual(self.session.calls, ['place_order', 'get_tickers'])
+        self.assertEqual(so.open.price, ED('0.0201'))
+
+    def test_stale_or_unknown_symbol(self):
+        self.assertIsNone(self.armory.build_order(
+            symbol='AUSDT', side=OrderSide.BUY, open=MarketPosition(1, 1)))
+        self.clock.now += 61
+        self.assertIsNone(self.armory.get('PEOPLEUSDT'))
+
+    def test_limit_order(self):
+        so = self.armory.get('CUSDT').build_order(
+            side=OrderSide.SELL, open=MarketPosition(5, '0.030012'),
+            type=OrderType.LIMIT)
+        self.assertEqual(so.type, OrderType.LIMIT)
+        self.assertEqual(so.place_order_payload(
+            self.armory.get('CUSDT').payload)['price'], ED('0.03'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+import unittest
+
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder
+from profiling import Profiler
+
+
+def busy_updates(stop: threading.Event) -> None:
+    so = SimpleOrder(category=OrderCategory.LINEAR,
+                     type=OrderType.MARKET,
+                     symbol='PEOPLEUSDT',
+                     side=OrderSide.BUY,
+                     open=MarketPosition(3, '0.02'),
+                     stop_losses=[MarketPosition(1, '0.015')],
+                     take_profits=[MarketPosition(1, '0.03')])
+    while not stop.is_set():
+        so.update()
+
+
+class ProfilerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.profiler = Profiler(output_dir=self.tmp.name, interval=0.001)
+
+    def test_inactive_by_default(self):
+        self.assertFalse(self.profiler.active)
+        self.assertEqual(self.profiler.stop(), [])
+        self.assertEqual(self.profiler.control('status'), 'inactive')
+
+    def test_window_writes_reports(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_updates, args=(stop,))
+        worker.start()
+        try:
+            self.assertEqual(self.profiler.control('start'), 'started')
+            time.sleep(0.2)
+            self.assertTrue(self.profiler.control('status').startswith(
+                'active'))
+            paths = self.profiler.stop()
+        finally:
+            stop.set()
+            worker.join()
+
+        self.assertFalse(tracemalloc.is_tracing())
+        folded, alloc = paths
+        with open(folded) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any('update (__init__.py' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit()
+                            for line in lines))
+        self.assertTrue(os.path.getsize(alloc) > 0)
+
+    def test_duration_stops_automatically(self):
+        self.profiler.start(duration=0.05)
+        time.sleep(0.3)
+        self.assertFalse(self.profiler.active)
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+
+from crypto_math import ED
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder
+from reconcile import Reconciler
+from reconcile.exceptions import ErrorReconcile
+
+
+class ReconcileSessionMock():
+    '''Serves positions, open orders and history by pages'''
+
+    def __init__(self, positions: list, open_orders: list,
+                 history: list) -> None:
+        self.rows = {'get_positions': positions,
+                     'get_open_orders': open_orders,
+                     'get_order_history': history}
+        self.calls = []
+        self.ret_code = 0
+
+    def _page(self, method: str, limit: int, cursor: str) -> dict:
+        self.calls.append(method)
+        start = int(cursor or 0)
+        end = start + limit
+        rows = self.rows[method]
+        return {'retCode': self.ret_code,
+                'result': {'list': rows[start:end],
+                           'nextPageCursor': str(end)
+                           if end < len(rows) else ''}}
+
+    def get_positions(self, limit: int, cursor: str, **kwargs) -> dict:
+        return self._page('get_positions', 2, cursor)
+
+    def get_open_orders(self, limit: int, cursor: str, **kwargs) -> dict:
+        return self._page('get_open_orders', 2, cursor)
+
+    def get_order_history(self, limit: int, cursor: str, **kwargs) -> dict:
+        return self._page('get_order_history', 2, cursor)
+
+
+def make_order(symbol: str, side: OrderSide = OrderSide.BUY) -> SimpleOrder:
+    return SimpleOrder(category=OrderCategory.LINEAR,
+                       type=OrderType.MARKET,
+                       symbol=symbol,
+                       side=side,
+                       open=MarketPosition(10, 1),
+                       stop_losses=[MarketPosition(5, '0.9')],
+                       take_profits=[MarketPosition(5, '1.1'),
+                                     MarketPosition(5, '1.2')])
+
+
+class ReconcilerTests(unittest.TestCase):
+
+    def setUp(self):
+        self.filled = make_order('AUSDT')
+        self.limit = make_order('BUSDT')
+        self.gone = make_order('CUSDT', OrderSide.SELL)
+        self.gone.synced_take_profits.add((ED('1.1'), ED(5)))
+        self.shared = [make_order('DUSDT'), make_order('DUSDT')]
+        for so in self.shared:
+            so.synced_take_profits.add((ED('1.2'), ED(5)))
+        self.orders = [self.filled, self.limit, self.gone] + self.shared
+
+        positions = [
+            {'symbol': 'AUSDT', 'side': 'Buy', 'size': '7',
+             'markPrice': '1.05', 'trailingStop': '0.02',
+             'activePrice': '1.1'},
+            {'symbol': 'CUSDT', 'side': '', 'size': '0', 'markPrice': '2'},
+            {'symbol': 'DUSDT', 'side': 'Buy', 'size': '20',
+             'markPrice': '1', 'trailingStop': '0'},
+            {'symbol': 'EUSDT', 'side': 'Sell', 'size': '3',
+             'markPrice': '5'},
+        ]
+        open_orders = [
+            {'orderId': 'ext-b', 'orderLinkId': self.limit.id,
+             'symbol': 'BUSDT', 'cumExecQty': '4', 'stopOrderType': ''},
+            {'orderId': 'tp-a', 'orderLinkId': '', 'symbol': 'AUSDT',
+             'stopOrderType': 'PartialTakeProfit', 'triggerPrice': '1.1',
+             'qty': '5'},
+            {'orderId': 'tp-a-full', 'orderLinkId': '', 'symbol': 'AUSDT',
+             'stopOrderType': 'TakeProfit', 'triggerPrice': '1.2',
+             'qty': '0'},
+            {'orderId': 'tp-d', 'orderLinkId': '', 'symbol': 'DUSDT',
+             'stopOrderType': 'PartialTakeProfit', 'triggerPrice': '1.1',
+             'qty': '5'},
+            {'orderId': 'manual', 'orderLinkId': 'manual',
+             'symbol': 'EUSDT', 'stopOrderType': ''},
+        ]
+        history = [
+            {'orderId': 'old', 'orderLinkId': 'other'},
+            {'orderId': 'ext-a', 'orderLinkId': self.filled.id},
+            {'orderId': 'ext-c', 'orderLinkId': self.gone.id},
+        ]
+        self.session = ReconcileSessionMock(positions, open_orders, history)
+        self.reconciler = Reconciler(self.session, OrderCategory.LINEAR,
+                                     history_pages=1)
+
+    def test_reconcile(self):
+        report = self.reconciler.reconcile(self.orders)
+
+        self.assertEqual(self.filled.current.qty, ED(7))
+        self.assertEqual(self.filled.current.price, ED('1.05'))
+        self.assertEqual(self.filled.external_id, 'ext-a')
+        self.assertEqual(self.filled.synced_take_profits,
+                         {(ED('1.1'), ED(5))})
+        self.assertEqual(self.filled.synced_trailing_stop,
+                         (ED('0.02'), ED('1.1')))
+        self.assertEqual(self.limit.external_id, 'ext-b')
+        self.assertEqual(self.limit.current.qty, ED(4))
+
+        self.assertIn(self.filled, report.updated)
+        self.assertEqual(report.pending, [self.limit])
+        self.assertEqual(report.missing, [self.gone])
+        self.assertEqual(report.shared_symbols, {'DUSDT'})
+        for so in self.shared:
+            self.assertEqual(so.current.qty, ED(10))
+            self.assertEqual(so.synced_take_profits, {(ED('1.2'), ED(5))})
+        self.assertEqual(self.gone.synced_take_profits, set())
+        self.assertEqual([p['symbol'] for p in report.orphan_positions],
+                         ['EUSDT'])
+        self.assertEqual([o['orderId'] for o in report.orphan_orders],
+                         ['manual'])
+
+    def test_requests_do_not_grow_with_orders(self):
+        report = self.reconciler.reconcile(self.orders)
+        # 2 pages of positions, 3 of open orders, 1 of history
+        self.assertEqual(report.requests, 6)
+        self.assertEqual(report.requests, len(self.session.calls))
+
+    def test_api_error(self):
+        self.session.ret_code = 10001
+        with self.assertRaises(ErrorReconcile):
+            self.reconciler.reconcile(self.orders)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+
+from crypto_math import ED
+
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder, TrailingStop
+from simpleorder.exceptions import ErrorSetTradingStop
+
+
+class TradingStopSessionMock():
+
+    def __init__(self) -> None:
+        self.calls = []
+        self.cancelled = []
+        self.ret_code = 0
+        # Partial TP/SL orders live on exchange
+        self.orders = []
+        self.page_size = 50
+        self.pages = 0
+
+    def set_trading_stop(self, **kwargs) -> dict:
+        self.calls.append(kwargs)
+        if self.ret_code == 0 and kwargs.get('tpslMode') == 'Partial':
+            if 'takeProfit' in kwargs:
+                order = {'stopOrderType': 'PartialTakeProfit',
+                         'triggerPrice': kwargs['takeProfit'],
+                         'qty': kwargs['tpSize']}
+            else:
+                order = {'stopOrderType': 'PartialStopLoss',
+                         'triggerPrice': kwargs['stopLoss'],
+                         'qty': kwargs['slSize']}
+            order['orderId'] = f'tpsl-{len(self.calls)}'
+            self.orders.append(order)
+        return {'retCode': self.ret_code, 'result': {}}
+
+    def get_open_orders(self, limit: int = 20, cursor: str = '',
+                        **kwargs) -> dict:
+        self.pages += 1
+        start = int(cursor or 0)
+        end = start + min(limit, self.page_size)
+        return {'retCode': 0,
+                'result': {'list': self.orders[start:end],
+                           'nextPageCursor': str(end)
+                           if end < len(self.orders) else ''}}
+
+    def cancel_order(self, orderId: str, **kwargs) -> dict:
+        self.cancelled.append(orderId)
+        self.orders = [o for o in self.orders if o['orderId'] != orderId]
+        return {'retCode': 0, 'result': {'orderId': orderId}}
+
+
+class TradingStopSyncTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = TradingStopSessionMock()
+        self.so = SimpleOrder(category=OrderCategory.LINEAR,
+                              type=OrderType.MARKET,
+                              symbol='PEOPLEUSDT',
+                              side=OrderSide.BUY,
+                              open=MarketPosition(3, '0.02'),
+                              stop_losses=[MarketPosition(1, '0.015'),
+                                           MarketPosition(2, '0.01')],
+                              take_profits=[MarketPosition(1, '0.03'),
+                                            MarketPosition(1, '0.04'),
+                                            MarketPosition(1, '0.05')])
+        self.so.update()
+
+    def test_only_changed_take_profits_are_sent(self):
+        self.assertEqual(self.so.api_set_trading_stop(self.session), 2)
+        self.assertEqual(self.so.api_set_trading_stop(self.session), 0)
+
+        self.so.take_profits[1].price = '0.045'
+        # Open orders lookup, cancel of 0.04 and set of 0.045
+        self.assertEqual(self.so.api_set_trading_stop(self.session), 3)
+        self.assertEqual(self.session.calls[-1]['takeProfit'], '0.045')
+        self.assertEqual(len(self.session.calls), 3)
+        self.assertEqual(self.session.cancelled, ['tpsl-2'])
+        self.assertEqual(self.so.synced_take_profits,
+                         {(ED('0.03'), ED(1)), (ED('0.045'), ED(1))})
+        self.assertEqual(sorted(o['triggerPrice']
+                                for o in self.session.orders),
+                         ['0.03', '0.045'])
+        self.assertEqual(self.so.api_set_trading_stop(self.session), 0)
+
+    def test_stale_level_is_found_on_later_page(self):
+        self.so.api_set_trading_stop(self.session)
+        # Other open orders of the symbol push TP levels to page 3
+        self.session.orders[:0] = [
+            {'orderId': f'limit-{num}', 'stopOrderType': '',
+             'triggerPrice': '0', 'qty': '1'} for num in range(4)]
+        self.session.page_size = 2
+
+        self.so.take_profits[1].price = '0.045'
+        self.so.api_set_trading_stop(self.session)
+        self.assertEqual(self.session.pages, 3)
+        self.assertEqual(self.session.cancelled, ['tpsl-2'])
+        self.assertEqual(self.so.synced_take_profits,
+                         {(ED('0.03'), ED(1)), (ED('0.045'), ED(1))})
+
+    def test_only_changed_stop_losses_are_sent(self):
+        self.assertEqual(self.so.set_partial_stop_losses(self.session), 1)
+        self.assertEqual(self.so.set_partial_stop_losses(self.session), 0)
+        self.so.forget_synced_state()
+        self.assertEqual(self.so.set_partial_stop_losses(self.session), 1)
+
+    def test_failed_level_is_resent(self):
+        self.session.ret_code = 10001
+        with self.assertRaises(ErrorSetTradingStop):
+            self.so.api_set_trading_stop(self.session)
+        self.assertEqual(self.so.synced_take_profits, set())
+
+        self.session.ret_code = 0
+        self.assertEqual(self.so.api_set_trading_stop(self.session), 2)
+
+    def test_same_trailing_stop_is_not_resent(self):
+        def trailing_stop(distance: str) -> TrailingStop:
+            return TrailingStop(active=True,
+                                distance=MarketPosition(0, distance),
+                                activation_price=MarketPosition(0, '0.03'))
+
+        self.assertEqual(self.so.api_set_trailing_stop(
+            trailing_stop=trailing_stop('0.005'), session=self.session), 1)
+        self.assertEqual(self.so.api_set_trailing_stop(
+            trailing_stop=trailing_stop('0.005'), session=self.session), 0)
+        self.assertEqual(self.so.api_set_trailing_stop(
+            trailing_stop=trailing_stop('0.006'), session=self.session), 1)
+        self.assertEqual(len(self.session.calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
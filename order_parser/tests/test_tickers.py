@@ -0,0 +1,102 @@
+import unittest
+
+from crypto_math import ED
+from market_utils import MarketPosition, OrderSide, OrderCategory, OrderType
+from simpleorder import SimpleOrder
+from simpleorder.exceptions import ErrorUpdateCurrentPrice
+from tickers import TickerSnapshot
+from tickers.exceptions import ErrorGetTickers, ErrorTickerNotFound
+from tests.mocks import ClockMock
+
+
+class SessionMock():
+
+    def __init__(self, ret_code: int = 0) -> None:
+        self.calls = 0
+        self.ret_code = ret_code
+        self.prices = {'BTCUSDT': '27000.5', 'PEOPLEUSDT': '0.02'}
+
+    def get_tickers(self, category: str, symbol: str = None) -> dict:
+        self.calls += 1
+        return {'retCode': self.ret_code,
+                'result': {'category': category,
+                           'list': [{'symbol': s, 'markPrice': p}
+                                    for s, p in self.prices.items()]}}
+
+
+class TickerSnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+        self.session = SessionMock()
+        self.clock = ClockMock(now=100.)
+        self.snapshot = TickerSnapshot(session=self.session,
+                                       category=OrderCategory.LINEAR,
+                                       max_age=5,
+                                       clock=self.clock)
+
+    def make_order(self, symbol: str) -> SimpleOrder:
+        return SimpleOrder(category=OrderCategory.LINEAR,
+                           type=OrderType.MARKET,
+                           symbol=symbol,
+                           side=OrderSide.BUY,
+                           open=MarketPosition(1, 1),
+                           stop_losses=[MarketPosition(1, '0.5')])
+
+    def test_one_request_for_many_orders(self):
+        orders = [self.make_order('BTCUSDT') for _ in range(10)] + \
+            [self.make_order('PEOPLEUSDT') for _ in range(10)]
+        for so in orders:
+            so.update_current_price(self.snapshot)
+
+        self.assertEqual(self.session.calls, 1)
+        self.assertEqual(orders[0].current.price, ED('27000.5'))
+        self.assertEqual(orders[-1].current.price, ED('0.02'))
+        self.assertEqual(len(orders[0].current_losses), 1)
+
+    def test_refresh_after_max_age(self):
+        self.assertEqual(self.snapshot.get_mark_price('BTCUSDT'),
+                         ED('27000.5'))
+        self.session.prices['BTCUSDT'] = '28000'
+        self.clock.now += 5
+        self.assertEqual(self.snapshot.get_mark_price('BTCUSDT'),
+                         ED('27000.5'))
+        self.clock.now += 0.1
+        self.assertEqual(self.snapshot.get_mark_price('BTCUSDT'),
+                         ED('28000'))
+        self.assertEqual(self.session.calls, 2)
+
+    def test_unknown_symbol(self):
+        with self.assertRaises(ErrorTickerNotFound):
+            self.snapshot.get_mark_price('UNKNOWN')
+        with self.assertRaises(ErrorUpdateCurrentPrice):
+            self.make_order('UNKNOWN').update_current_price(self.snapshot)
+
+    def test_api_error(self):
+        self.session.ret_code = 10001
+        with self.assertRaises(ErrorGetTickers):
+            self.snapshot.refresh()
+        self.assertTrue(self.snapshot.is_stale())
+
+    def test_failed_refresh_backs_off(self):
+        self.session.ret_code = 10001
+        orders = [self.make_order('BTCUSDT') for _ in range(10)]
+        for so in orders:
+            with self.assertRaises(ErrorUpdateCurrentPrice):
+                so.update_current_price(self.snapshot)
+        self.assertEqual(self.session.calls, 1)
+
+        self.session.ret_code = 0
+        self.clock.now += 5
+        with self.assertRaises(ErrorGetTickers):
+            self.snapshot.get_mark_price('BTCUSDT')
+        self.assertEqual(self.session.calls, 1)
+
+        self.clock.now += 0.1
+        self.assertEqual(self.snapshot.get_mark_price('BTCUSDT'),
+                         ED('27000.5'))
+        self.assertEqual(self.session.calls, 2)
+        self.assertIsNone(self.snapshot.failed_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from multiprocessing import shared_memory
+
+import wire
+from wire.exceptions import WireFormatError, WireVersionError
+from crypto_math import ED
+from market_utils import MarketPosition, OrderSide, OrderCategory, \
+    OrderType, InstrumentInfo
+from advparser import AdviserPrediction
+from simpleorder import SimpleOrder
+from tests.mocks import INSTRUMENT_INFO_MOCK
+
+
+class WireTests(unittest.TestCase):
+
+    def setUp(self):
+        self.instrument_info = InstrumentInfo.parse_raw(INSTRUMENT_INFO_MOCK)
+        self.order = SimpleOrder(
+            category=OrderCategory.LINEAR,
+            type=OrderType.MARKET,
+            symbol='PEOPLEUSDT',
+            side=OrderSide.SELL,
+            open=MarketPosition(3, '0.02'),
+            stop_losses=[MarketPosition(1, '0.025'),
+                         MarketPosition(2, '0.03')],
+            take_profits=[MarketPosition(3, '0.015555555555555555555')],
+            adviser='Test Adviser')
+        self.order.instrument_info = self.instrument_info
+        self.order.external_id = 'ext-1'
+        self.order.current.price = ED('-0.0199')
+        self.order.update()
+        self.order.synced_take_profits.add((ED('0.015'), ED(3)))
+        self.order.synced_trailing_stop = (ED('0.001'), ED('0.018'))
+
+    def assertPositionEqual(self, a, b):
+        self.assertEqual((a.qty, a.price, a.value),
+                         (b.qty, b.price, b.value))
+
+    def test_market_position_keeps_exact_decimals(self):
+        mp = MarketPosition(1, 2) + MarketPosition(2, '3.333333333333')
+        res = wire.decode(wire.encode(mp))
+        self.assertPositionEqual(res, mp)
+        self.assertEqual(str(res.price), str(mp.price))
+
+    def test_instrument_info(self):
+        res = wire.decode(wire.encode(self.instrument_info))
+        self.assertEqual(res, self.instrument_info)
+
+    def test_adviser_prediction(self):
+        ap = AdviserPrediction(adviser='Test',
+                               prediction_text='LONG\nOpen 6.342-6.153\n'
+                                               'TP 6.411 6.475\nSL 5.965')
+        res = wire.decode(wire.encode(ap))
+        for name in ('id', 'adviser', 'prediction_text', 'side',
+                     'symbol', 'leverage', 'opens', 'stop_losses', 'take_profits'):
+            self.assertEqual(getattr(res, name), getattr(ap, name))
+
+    def test_simple_order(self):
+        res = wire.decode(wire.encode(self.order))
+        for name in ('id', 'external_id', 'category', 'side', 'type',
+                     'symbol', 'adviser', 'instrument_info', 'risk_rate',
+                     'synced_take_profits', 'synced_stop_losses',
+                     'synced_trailing_stop'):
+            self.assertEqual(getattr(res, name), getattr(self.order, name))
+        self.assertPositionEqual(res.open, self.order.open)
+        self.assertPositionEqual(res.current, self.order.current)
+        for a, b in zip(res.stop_losses + res.take_profits,
+                        self.order.stop_losses + self.order.take_profits):
+            self.assertPositionEqual(a, b)
+
+    def test_records_in_shared_memory(self):
+        shm = shared_memory.SharedMemory(create=True, size=4096)
+        try:
+            offset = wire.encode_into(shm.buf, 0, self.order)
+            wire.encode_into(shm.buf, offset, self.order.open)
+
+            order, offset = wire.decode_from(shm.buf, 0)
+            position, _ = wire.decode_from(shm.buf, offset)
+            self.assertEqual(order.id, self.order.id)
+            self.assertPositionEqual(position, self.order.open)
+            del order, position
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_bad_records(self):
+        data = bytearray(wire.encode(self.order.open))
+        with self.assertRaises(WireFormatError):
+            wire.decode(data[:-1])
+        data[2] = wire.VERSION + 1
+        with self.assertRaises(WireVersionError):
+            wire.decode(data)
+
+    def test_values_out_of_wire_range(self):
+        with self.assertRaises(WireFormatError):
+            wire.encode(MarketPosition('1E+40000', 1))
+        ap = AdviserPrediction(adviser='Test',
+                               prediction_text='LONG\nOpen 6.342\n'
+                                               'TP 6.411\nSL 5.965')
+        ap.prediction_text += ' ' * 70000
+        with self.assertRaises(WireFormatError):
+            wire.encode(ap)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import time
+import logging
+import threading
+
+from typing import Callable
+from pybit.unified_trading import HTTP
+
+from crypto_math import ED
+from market_utils import OrderCategory
+from tickers.exceptions import ErrorGetTickers, ErrorTickerNotFound
+
+logger = logging.getLogger(__name__)
+
+
+class TickerSnapshot():
+    '''
+    1. Class keeps symbol -> mark price table of the whole category
+       fetched by one session.get_tickers() call.
+    2. Table is refreshed at most once per max_age seconds no matter
+       how many orders read prices from it.
+    3. After a failed refresh, readers get the cached error without
+       requesting exchange until max_age seconds passed since the
+       failure.
+    '''
+
+    def __init__(self,
+                 session: HTTP,
+                 category: OrderCategory,
+                 max_age: float = 1.0,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.session = session
+        self.category = category
+        self.max_age = max_age
+        self.clock = clock
+
+        self.prices: dict[str, ED] = {}
+        self.updated_at: float = None
+        self.refresh_count: int = 0
+        self.failed_at: float = None
+        self.error: Exception = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.category=}, '\
+            f'{self.max_age=}, {len(self.prices)=}, {self.updated_at=})'
+
+    def age(self) -> float:
+        '''Seconds since last refresh, inf if never refreshed'''
+        if self.updated_at is None:
+            return float('inf')
+        return self.clock() - self.updated_at
+
+    def is_stale(self) -> bool:
+        return self.age() > self.max_age
+
+    def refresh(self) -> None:
+        '''Requests tickers of the whole category from exchange'''
+        try:
+            logger.debug('Requesting exchange tickers via '
+                         f'session.get_tickers() for {self}')
+            res = self.session.get_tickers(category=self.category.value)
+
+            if res['retCode'] != 0:
+                logger.error(f'Update tickers {self} API error {res}')
+                raise ErrorGetTickers(res)
+            self.prices = {ticker['symbol']: ED(ticker['markPrice'])
+                           for ticker in res['result']['list']
+                           if ticker.get('markPrice')}
+            self.updated_at = self.clock()
+            self.refresh_count += 1
+            self.failed_at, self.error = None, None
+            logger.info(f'Tickers {self} successfully updated')
+        except Exception as e:
+            logger.exception(f'Update tickers {self} exception {e}')
+            self.failed_at, self.error = self.clock(), e
+            raise ErrorGetTickers
+
+    def _raise_if_backing_off(self) -> None:
+        '''Raises cached error if last refresh failed within max_age'''
+        failed_at, error = self.failed_at, self.error
+        if failed_at is not None and \
+                self.clock() - failed_at <= self.max_age:
+            raise ErrorGetTickers(
+                f'Tickers refresh failed {self.clock() - failed_at:.1f}s '
+                f'ago: {error}') from error
+
+    def refresh_if_stale(self) -> None:
+        '''
+        Refreshes table once even if many threads find it stale.
+        After a failure, no request is sent until max_age passed.
+        '''
+        if not self.is_stale():
+            return
+        self._raise_if_backing_off()
+        with self._lock:
+            if self.is_stale():
+                self._raise_if_backing_off()
+                self.refresh()
+
+    def get_mark_price(self, symbol: str) -> ED:
+        '''Returns mark price of symbol not older than max_age'''
+        self.refresh_if_stale()
+        try:
+            return self.prices[symbol]
+        except KeyError:
+            raise ErrorTickerNotFound(
+                f'No {symbol=} in {self.category.value} tickers')
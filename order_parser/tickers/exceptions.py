@@ -0,0 +1,6 @@
+class ErrorGetTickers(Exception):
+    pass
+
+
+class ErrorTickerNotFound(Exception):
+    pass
@@ -0,0 +1,413 @@
+'''
+Compact versioned binary format to pass orders and predictions
+between processes.
+
+Every record is framed as:
+    magic(2) | version(1) | type(1) | body_length(4) | body
+
+Decimals are stored exactly as exponent(int16) + coefficient length(1) +
+coefficient (little endian two's complement), strings as uint16 length +
+utf-8, enums as uint8 index, TP/SL ladders as raw float64 rows.
+Decoding works directly on any buffer (bytes, bytearray, memoryview,
+multiprocessing.shared_memory buffer) without copying it.
+'''
+import datetime
+import decimal
+import math
+import struct
+
+import numpy as np
+
+from .exceptions import WireFormatError, WireVersionError, WireTypeError
+from crypto_math import ED
+from market_utils import OrderSide, OrderCategory, OrderType, \
+    MarketPosition, InstrumentInfo, LeverageFilter, PriceFilter, \
+    LotSizeFilter, PositionLadder
+from advparser import AdviserPrediction
+from simpleorder import SimpleOrder, TrailingStop
+
+MAGIC = b'CB'
+VERSION = 4
+
+TYPE_MARKET_POSITION = 1
+TYPE_INSTRUMENT_INFO = 2
+TYPE_ADVISER_PREDICTION = 3
+TYPE_SIMPLE_ORDER = 4
+
+_HEADER = struct.Struct('<2sBBI')
+_DECIMAL = struct.Struct('<hB')
+_U8 = struct.Struct('<B')
+_U16 = struct.Struct('<H')
+_I32 = struct.Struct('<i')
+_F64 = struct.Struct('<d')
+
+_SIDES = list(OrderSide)
+_CATEGORIES = list(OrderCategory)
+_TYPES = list(OrderType)
+
+
+class _Writer():
+    '''Appends primitive values to one bytearray'''
+
+    __slots__ = ('buf',)
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+
+    def u8(self, val: int) -> None:
+        self.buf += _U8.pack(val)
+
+    def i32(self, val: int) -> None:
+        self.buf += _I32.pack(val)
+
+    def f64(self, val: float) -> None:
+        self.buf += _F64.pack(val)
+
+    def str(self, val: str) -> None:
+        data = val.encode()
+        self.buf += _U16.pack(len(data))
+        self.buf += data
+
+    def decimal(self, val) -> None:
+        if not isinstance(val, decimal.Decimal):
+            val = ED(val)
+        sign, digits, exponent = val.as_tuple()
+        if not isinstance(exponent, int):
+            raise WireFormatError(f'Non finite decimal {val=}')
+        coefficient = 0
+        for digit in digits:
+            coefficient = coefficient * 10 + digit
+        if sign:
+            coefficient = -coefficient
+        data = coefficient.to_bytes(
+            (coefficient.bit_length() + 8) // 8, 'little', signed=True)
+        self.buf += _DECIMAL.pack(exponent, len(data))
+        self.buf += data
+
+
+class _Reader():
+    '''Reads primitive values from a memoryview moving offset'''
+
+    __slots__ = ('view', 'offset')
+
+    def __init__(self, view: memoryview, offset: int) -> None:
+        self.view = view
+        self.offset = offset
+
+    def u8(self) -> int:
+        val, = _U8.unpack_from(self.view, self.offset)
+        self.offset += _U8.size
+        return val
+
+    def i32(self) -> int:
+        val, = _I32.unpack_from(self.view, self.offset)
+        self.offset += _I32.size
+        return val
+
+    def f64(self) -> float:
+        val, = _F64.unpack_from(self.view, self.offset)
+        self.offset += _F64.size
+        return val
+
+    def str(self) -> str:
+        length, = _U16.unpack_from(self.view, self.offset)
+        start = self.offset + _U16.size
+        self.offset = start + length
+        return str(self.view[start:self.offset], 'utf-8')
+
+    def decimal(self) -> ED:
+        exponent, length = _DECIMAL.unpack_from(self.view, self.offset)
+        start = self.offset + _DECIMAL.size
+        self.offset = start + length
+        coefficient = int.from_bytes(self.view[start:self.offset],
+                                     'little', signed=True)
+        return decimal.Decimal.__new__(ED, f'{coefficient}E{exponent}')
+
+
+def _write_market_position(w: _Writer, mp: MarketPosition) -> None:
+    w.decimal(mp.qty)
+    w.decimal(mp.price)
+    w.decimal(mp.value)
+
+
+def _read_market_position(r: _Reader) -> MarketPosition:
+    return MarketPosition.from_values(r.decimal(), r.decimal(), r.decimal())
+
+
+def _write_market_positions(w: _Writer, mps: list[MarketPosition]) -> None:
+    w.i32(len(mps))
+    for mp in mps:
+        _write_market_position(w, mp)
+
+
+def _read_market_positions(r: _Reader) -> list[MarketPosition]:
+    return [_read_market_position(r) for _ in range(r.i32())]
+
+
+def _write_levels(w: _Writer, levels: set[tuple[ED, ED]]) -> None:
+    w.i32(len(levels))
+    for price, qty in levels:
+        w.decimal(price)
+        w.decimal(qty)
+
+
+def _read_levels(r: _Reader) -> set[tuple[ED, ED]]:
+    return {(r.decimal(), r.decimal()) for _ in range(r.i32())}
+
+
+def _write_ladder(w: _Writer, ladder: PositionLadder) -> None:
+    w.u8(ladder.direction > 0)
+    w.i32(len(ladder))
+    w.buf += np.ascontiguousarray(ladder.data, dtype='<f8').tobytes()
+
+
+def _read_ladder(r: _Reader, levels: list[MarketPosition],
+                 open: MarketPosition,
+                 current: MarketPosition) -> PositionLadder:
+    ladder = PositionLadder(direction=1 if r.u8() else -1)
+    rows = r.i32()
+    count = rows * PositionLadder.COLUMNS
+    # Copy detaches ladder from the (possibly shared) source buffer
+    ladder.data = np.frombuffer(r.view, dtype='<f8', count=count,
+                                offset=r.offset).reshape(rows, -1).copy()
+    r.offset += count * _F64.size
+    ladder.levels = levels
+    # Exact views are calculated against open and current of the order
+    ladder.open = MarketPosition.from_values(open.qty, open.price,
+                                             open.value)
+    ladder.current = MarketPosition.from_values(current.qty, current.price,
+                                                current.value)
+    return ladder
+
+
+def _write_instrument_info(w: _Writer, info: InstrumentInfo) -> None:
+    w.str(info.symbol)
+    w.str(info.launchTime)
+    w.str(info.deliveryTime)
+    w.str(info.deliveryFeeRate)
+    w.decimal(info.priceScale)
+    w.decimal(info.leverageFilter.minLeverage)
+    w.decimal(info.leverageFilter.maxLeverage)
+    w.decimal(info.leverageFilter.leverageStep)
+    w.decimal(info.priceFilter.minPrice)
+    w.decimal(info.priceFilter.maxPrice)
+    w.decimal(info.priceFilter.tickSize)
+    w.decimal(info.lotSizeFilter.maxOrderQty)
+    w.decimal(info.lotSizeFilter.minOrderQty)
+    w.decimal(info.lotSizeFilter.qtyStep)
+    w.decimal(info.lotSizeFilter.postOnlyMaxOrderQty)
+    w.i32(info.fundingInterval)
+
+
+def _read_instrument_info(r: _Reader) -> InstrumentInfo:
+    # Values were validated on encoding side, so construct() skips it
+    return InstrumentInfo.construct(
+        symbol=r.str(),
+        launchTime=r.str(),
+        deliveryTime=r.str(),
+        deliveryFeeRate=r.str(),
+        priceScale=r.decimal(),
+        leverageFilter=LeverageFilter.construct(
+            minLeverage=r.decimal(),
+            maxLeverage=r.decimal(),
+            leverageStep=r.decimal()),
+        priceFilter=PriceFilter.construct(
+            minPrice=r.decimal(),
+            maxPrice=r.decimal(),
+            tickSize=r.decimal()),
+        lotSizeFilter=LotSizeFilter.construct(
+            maxOrderQty=r.decimal(),
+            minOrderQty=r.decimal(),
+            qtyStep=r.decimal(),
+            postOnlyMaxOrderQty=r.decimal()),
+        fundingInterval=r.i32())
+
+
+def _write_adviser_prediction(w: _Writer, ap: AdviserPrediction) -> None:
+    w.str(ap.id)
+    w.f64(ap.dt.timestamp()
+          if isinstance(ap.dt, datetime.datetime) else math.nan)
+    w.str(ap.adviser)
+    w.str(ap.prediction_text)
+    w.u8(_SIDES.index(ap.side))
+    w.str(ap.symbol)
+    w.decimal(ap.leverage)
+    for prices in (ap.opens, ap.stop_losses, ap.take_profits):
+        w.i32(len(prices))
+        for price in prices:
+            w.decimal(price)
+
+
+def _read_adviser_prediction(r: _Reader) -> AdviserPrediction:
+    # Text is already parsed, so __post_init__ is bypassed
+    ap = AdviserPrediction.__new__(AdviserPrediction)
+    ap.id = r.str()
+    timestamp = r.f64()
+    ap.dt = datetime.datetime.fromtimestamp(timestamp) \
+        if not math.isnan(timestamp) else datetime.datetime
+    ap.adviser = r.str()
+    ap.prediction_text = r.str()
+    ap.side = _SIDES[r.u8()]
+    ap.symbol = r.str()
+    ap.leverage = r.decimal()
+    ap.opens = [r.decimal() for _ in range(r.i32())]
+    ap.stop_losses = [r.decimal() for _ in range(r.i32())]
+    ap.take_profits = [r.decimal() for _ in range(r.i32())]
+    return ap
+
+
+def _write_simple_order(w: _Writer, so: SimpleOrder) -> None:
+    w.str(so.id)
+    w.str(so.external_id)
+    w.u8(_CATEGORIES.index(so.category))
+    w.u8(_SIDES.index(so.side))
+    w.u8(_TYPES.index(so.type))
+    w.str(so.symbol)
+    w.str(so.adviser)
+    w.u8(so.instrument_info is not None)
+    if so.instrument_info is not None:
+        _write_instrument_info(w, so.instrument_info)
+    _write_market_position(w, so.open)
+    _write_market_position(w, so.current)
+    _write_market_positions(w, so.stop_losses)
+    _write_market_positions(w, so.take_profits)
+    w.u8(so.trailing_stop.active)
+    _write_market_position(w, so.trailing_stop.distance)
+    _write_market_position(w, so.trailing_stop.activation_price)
+    _write_ladder(w, so.losses)
+    _write_ladder(w, so.profits)
+    w.decimal(so.risk_rate)
+    _write_levels(w, so.synced_take_profits)
+    _write_levels(w, so.synced_stop_losses)
+    w.u8(so.synced_trailing_stop is not None)
+    if so.synced_trailing_stop is not None:
+        w.decimal(so.synced_trailing_stop[0])
+        w.decimal(so.synced_trailing_stop[1])
+
+
+def _read_simple_order(r: _Reader) -> SimpleOrder:
+    order_id = r.str()
+    external_id = r.str()
+    category = _CATEGORIES[r.u8()]
+    side = _SIDES[r.u8()]
+    type = _TYPES[r.u8()]
+    symbol = r.str()
+    adviser = r.str()
+    instrument_info = _read_instrument_info(r) if r.u8() else None
+    open = _read_market_position(r)
+
+    # Fields are restored as is, so __init__ is bypassed
+    so = SimpleOrder.__new__(SimpleOrder)
+    so.category = category
+    so.side = side
+    so.type = type
+    so.symbol = symbol
+    so.adviser = adviser
+    so.open = open
+    so.id = order_id
+    so.external_id = external_id
+    so.instrument_info = instrument_info
+    so.current = _read_market_position(r)
+    so.stop_losses = _read_market_positions(r)
+    so.take_profits = _read_market_positions(r)
+    active = bool(r.u8())
+    so.trailing_stop = TrailingStop(
+        distance=_read_market_position(r),
+        activation_price=_read_market_position(r),
+        active=active)
+    so.losses = _read_ladder(r, so.stop_losses, so.open, so.current)
+    so.profits = _read_ladder(r, so.take_profits, so.open, so.current)
+    so.risk_rate = r.decimal()
+    so.synced_take_profits = _read_levels(r)
+    so.synced_stop_losses = _read_levels(r)
+    so.synced_trailing_stop = (r.decimal(), r.decimal()) if r.u8() else None
+    return so
+
+
+_ENCODERS = {
+    MarketPosition: (TYPE_MARKET_POSITION, _write_market_position),
+    InstrumentInfo: (TYPE_INSTRUMENT_INFO, _write_instrument_info),
+    AdviserPrediction: (TYPE_ADVISER_PREDICTION, _write_adviser_prediction),
+    SimpleOrder: (TYPE_SIMPLE_ORDER, _write_simple_order),
+}
+
+_DECODERS = {
+    TYPE_MARKET_POSITION: _read_market_position,
+    TYPE_INSTRUMENT_INFO: _read_instrument_info,
+    TYPE_ADVISER_PREDICTION: _read_adviser_prediction,
+    TYPE_SIMPLE_ORDER: _read_simple_order,
+}
+
+
+def encode(obj) -> bytes:
+    '''
+    Encodes MarketPosition, InstrumentInfo, AdviserPrediction or
+    SimpleOrder into one framed record
+    '''
+    try:
+        type_id, writer = _ENCODERS[type(obj)]
+    except KeyError:
+        raise WireTypeError(f'Unsupported type {type(obj)=}')
+
+    w = _Writer()
+    w.buf += bytes(_HEADER.size)
+    try:
+        writer(w, obj)
+        _HEADER.pack_into(w.buf, 0, MAGIC, VERSION, type_id,
+                          len(w.buf) - _HEADER.size)
+    except (struct.error, OverflowError) as e:
+        # Field out of its wire range, e.g. string over 65535 bytes
+        # or decimal exponent out of int16
+        raise WireFormatError(f'Can not encode {type(obj)=}: {e}')
+    return bytes(w.buf)
+
+
+def decode_from(buffer, offset: int = 0) -> tuple[object, int]:
+    '''
+    Decodes one record from buffer at offset without copying the buffer.
+    Returns decoded object and offset of the next record.
+    '''
+    view = memoryview(buffer)
+    try:
+        magic, version, type_id, length = _HEADER.unpack_from(view, offset)
+    except struct.error as e:
+        raise WireFormatError(f'Truncated header at {offset=}: {e}')
+    if magic != MAGIC:
+        raise WireFormatError(f'Bad magic {magic=} at {offset=}')
+    if version != VERSION:
+        raise WireVersionError(f'Unsupported {version=}, expected {VERSION}')
+    if type_id not in _DECODERS:
+        raise WireTypeError(f'Unknown {type_id=} at {offset=}')
+
+    end = offset + _HEADER.size + length
+    if end > len(view):
+        raise WireFormatError(f'Truncated record at {offset=}')
+    r = _Reader(view[:end], offset + _HEADER.size)
+    try:
+        obj = _DECODERS[type_id](r)
+    except (struct.error, IndexError, ValueError) as e:
+        raise WireFormatError(f'Corrupted record at {offset=}: {e}')
+    if r.offset != end:
+        raise WireFormatError(f'Record length mismatch at {offset=}')
+    return obj, end
+
+
+def decode(buffer, offset: int = 0) -> object:
+    '''Decodes one record from buffer at offset'''
+    return decode_from(buffer, offset)[0]
+
+
+def encode_into(buffer, offset: int, obj) -> int:
+    '''
+    Writes record of obj into writable buffer (e.g. shared memory)
+    at offset. Returns offset of the next record.
+    '''
+    data = encode(obj)
+    end = offset + len(data)
+    view = memoryview(buffer)
+    if end > len(view):
+        raise WireFormatError(f'Buffer too small for {len(data)} bytes '
+                              f'at {offset=}')
+    view[offset:end] = data
+    return end
+
@@ -0,0 +1,10 @@
+class WireFormatError(Exception):
+    pass
+
+
+class WireVersionError(WireFormatError):
+    pass
+
+
+class WireTypeError(WireFormatError):
+    pass